@@ -0,0 +1,114 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, List, Optional
+
+import arxiv
+
+from tool_executor import ToolExecutor
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class ArxivScheduler:
+    """Process-wide owner of the arXiv client.
+
+    Every arXiv query in the server goes through `fetch`, which grants one
+    request at a time and spaces requests at least `min_interval` seconds
+    apart (arXiv asks for one request every 3 seconds). Waiting callers are
+    queued by priority, then arrival order, so interactive searches can
+    overtake batch work without reordering calls of equal priority. Waiting
+    happens on the event loop; only the HTTP fetch itself takes a worker thread.
+
+    `api_url` points the client at a different Atom endpoint, e.g. the local
+    stand-in in benchmarks/fake_arxiv.py. `on_fetch` is called with the
+    duration of every upstream request, excluding time spent queued.
+    """
+
+    def __init__(
+        self,
+        executor: ToolExecutor,
+        min_interval: float = 3.0,
+        page_size: int = 100,
+        num_retries: int = 3,
+        api_url: Optional[str] = None,
+        on_fetch: Optional[Callable[[float], None]] = None
+    ):
+        self.executor = executor
+        self.on_fetch = on_fetch
+        self.min_interval = min_interval
+        self.client = arxiv.Client(page_size=page_size, delay_seconds=min_interval, num_retries=num_retries)
+        if api_url:
+            self.client.query_url_format = api_url + "?{}"
+
+        self._waiting: list = []
+        self._seq = itertools.count()
+        self._busy = False
+        self._last_request = 0.0
+
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_fetch = 0.0
+
+    async def fetch(self, search: arxiv.Search, priority: int = PRIORITY_INTERACTIVE) -> List[arxiv.Result]:
+        """Run a search once it is this caller's turn and return all results."""
+        loop = asyncio.get_running_loop()
+        queued_at = time.monotonic()
+        turn = loop.create_future()
+        heapq.heappush(self._waiting, (priority, next(self._seq), turn))
+        self._dispatch()
+
+        try:
+            await turn
+        except asyncio.CancelledError:
+            # Give the slot back if it was granted just as we were cancelled
+            if turn.done() and not turn.cancelled():
+                self._release()
+            raise
+
+        try:
+            waited = time.monotonic() - queued_at
+            self.requests += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+            delay = self._last_request + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            started = time.monotonic()
+            try:
+                return await self.executor.run(lambda: list(self.client.results(search)))
+            finally:
+                fetch_time = time.monotonic() - started
+                self.total_fetch += fetch_time
+                if self.on_fetch:
+                    self.on_fetch(fetch_time)
+        finally:
+            self._release()
+
+    def _dispatch(self) -> None:
+        while not self._busy and self._waiting:
+            _, _, turn = heapq.heappop(self._waiting)
+            if not turn.done():
+                self._busy = True
+                turn.set_result(None)
+
+    def _release(self) -> None:
+        self._last_request = time.monotonic()
+        self._busy = False
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": sum(1 for _, _, turn in self._waiting if not turn.done()),
+            "busy": self._busy,
+            "requests": self.requests,
+            "avg_wait": self.total_wait / self.requests if self.requests else 0.0,
+            "max_wait": self.max_wait,
+            "avg_fetch": self.total_fetch / self.requests if self.requests else 0.0,
+            "min_interval": self.min_interval
+        }
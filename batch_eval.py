@@ -0,0 +1,159 @@
+"""Run a file of chatbot queries concurrently and record the results.
+
+Each input line is JSON: {"query": "..."} for a plain query, a "/prompt name
+key=value ..." query to run an MCP prompt, or {"prompt": "name",
+"arguments": {...}}. An optional "id" is copied to the output. A bare JSON
+string is read as a query.
+
+    uv run batch_eval.py queries.jsonl -o results.jsonl --concurrency 8
+
+Every query runs in a fresh conversation. One JSON record per query is
+written as it finishes, with the answer, the tool calls, a latency breakdown
+and, with --usage, token usage; a summary is printed at the end.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional, Tuple
+
+from mcp_chatbot import MCP_ChatBot
+
+
+def load_queries(path: str) -> List[dict]:
+    queries = []
+    with open(path, "r", encoding="utf-8") as input_file:
+        for line in input_file:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"query": item}
+            item.setdefault("id", len(queries))
+            queries.append(item)
+    return queries
+
+
+def parse_prompt(item: dict) -> Optional[Tuple[str, dict]]:
+    """Return (prompt name, arguments) if the item runs a prompt."""
+    if "prompt" in item:
+        return item["prompt"], item.get("arguments") or {}
+    query = item.get("query", "")
+    if not query.startswith("/prompt "):
+        return None
+    parts = query.split()
+    args = {}
+    for arg in parts[2:]:
+        key, _, value = arg.partition("=")
+        args[key.strip()] = value.strip()
+    return parts[1], args
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_one(chatbot: MCP_ChatBot, item: dict) -> dict:
+    started = time.perf_counter()
+    record = {"llm": [], "tool_calls": []}
+    output = {"id": item["id"], "query": item.get("query"), "answer": None, "error": None}
+    prompt_seconds = 0.0
+
+    async def discard(text: str) -> None:
+        pass
+
+    try:
+        query = item.get("query")
+        prompt = parse_prompt(item)
+        if prompt is not None:
+            output["prompt"], output["arguments"] = prompt
+            prompt_started = time.perf_counter()
+            query = await chatbot.render_prompt(*prompt)
+            prompt_seconds = time.perf_counter() - prompt_started
+            if not query:
+                raise ValueError(f"Prompt {prompt[0]} returned no text")
+        output["answer"] = await chatbot.process_query(query, on_text=discard, record=record)
+    except Exception as e:
+        output["error"] = f"{type(e).__name__}: {e}"
+
+    total = time.perf_counter() - started
+    llm_seconds = sum(call["total"] for call in record["llm"])
+    tool_seconds = sum(call["seconds"] for call in record["tool_calls"])
+    prompt_tokens = [call["prompt_tokens"] for call in record["llm"]]
+    completion_tokens = [call["completion_tokens"] for call in record["llm"]]
+    reported = record["llm"] and None not in prompt_tokens + completion_tokens
+
+    output["tool_calls"] = record["tool_calls"]
+    output["usage"] = {
+        "prompt_tokens": sum(prompt_tokens) if reported else None,
+        "completion_tokens": sum(completion_tokens) if reported else None,
+        "llm_calls": len(record["llm"])
+    }
+    output["latency"] = {
+        "total": total,
+        "prompt": prompt_seconds,
+        "llm": llm_seconds,
+        "llm_first_token": [call["ttft"] for call in record["llm"]],
+        # Tool calls of one turn run concurrently, so this can exceed their wall time
+        "tools": tool_seconds,
+        "other": max(0.0, total - prompt_seconds - llm_seconds - tool_seconds)
+    }
+    return output
+
+
+async def run_batch(chatbot: MCP_ChatBot, queries: List[dict], output_path: str, concurrency: int) -> List[dict]:
+    limit = asyncio.Semaphore(concurrency)
+    results = []
+
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        async def run_limited(item: dict) -> None:
+            async with limit:
+                result = await run_one(chatbot, item)
+            results.append(result)
+            output_file.write(json.dumps(result, default=str) + "\n")
+            output_file.flush()
+
+        await asyncio.gather(*[run_limited(item) for item in queries])
+    return results
+
+
+def summarize(results: List[dict], wall_time: float) -> None:
+    totals = [result["latency"]["total"] for result in results]
+    failed = sum(1 for result in results if result["error"])
+    tokens = [result["usage"]["prompt_tokens"] + result["usage"]["completion_tokens"]
+              for result in results if result["usage"]["prompt_tokens"] is not None]
+    print(f"\n{len(results)} queries in {wall_time:.1f}s, {failed} failed")
+    print(f"latency p50 {percentile(totals, 50):.2f}s, p95 {percentile(totals, 95):.2f}s, "
+          f"max {max(totals, default=0.0):.2f}s")
+    print(f"tool calls {sum(len(result['tool_calls']) for result in results)}, "
+          f"tokens {sum(tokens) if tokens else 'not reported'}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("queries", help="JSONL file of queries")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--usage", action="store_true",
+                        help="request token usage (needs an API version that supports stream_options)")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    chatbot = MCP_ChatBot()
+    chatbot.stream_usage = args.usage or chatbot.stream_usage
+    try:
+        await chatbot.connect_to_servers()
+        started = time.perf_counter()
+        results = await run_batch(chatbot, queries, args.output, args.concurrency)
+        summarize(results, time.perf_counter() - started)
+        print(f"Results written to {args.output}")
+    finally:
+        await chatbot.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+"""Local stand-in for the arXiv Atom API.
+
+Serves deterministic search feeds so the research server can be exercised
+offline: the same query always returns the same paper IDs, titles contain the
+query words, and an optional per-request latency simulates the real upstream.
+
+Run standalone:
+    python -m benchmarks.fake_arxiv --port 8089 --latency 0.2
+and point the research server at it with
+    ARXIV_API_URL=http://127.0.0.1:8089/api/query ARXIV_MIN_INTERVAL=0
+"""
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+
+FEED_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"
+      xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <title>arXiv Query: {query}</title>
+  <id>http://arxiv.org/api/fake</id>
+  <updated>2024-01-01T00:00:00Z</updated>
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  <opensearch:startIndex>{start}</opensearch:startIndex>
+  <opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>
+"""
+
+ENTRY = """  <entry>
+    <id>http://arxiv.org/abs/{paper_id}v1</id>
+    <updated>2024-01-{day:02d}T00:00:00Z</updated>
+    <published>2024-01-{day:02d}T00:00:00Z</published>
+    <title>{title}</title>
+    <summary>{summary}</summary>
+    <author><name>Author {author_a}</name></author>
+    <author><name>Author {author_b}</name></author>
+    <link href="http://arxiv.org/abs/{paper_id}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/{paper_id}v1" rel="related" type="application/pdf"/>
+    <arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>
+"""
+
+
+def fake_paper_id(query: str, index: int) -> str:
+    """Deterministic arXiv-style ID for the index-th result of a query."""
+    digest = int(hashlib.sha1(f"{query}|{index}".encode()).hexdigest(), 16)
+    return f"{2000 + (digest // 100000) % 500:04d}.{digest % 100000:05d}"
+
+
+def render_feed(query: str, start: int, count: int, total: int) -> str:
+    count = max(0, min(count, total - start))
+    words = query.replace("all:", "").strip() or "untitled"
+    parts = [FEED_HEADER.format(query=escape(query), total=total, start=start, count=count)]
+    for index in range(start, start + count):
+        parts.append(ENTRY.format(
+            paper_id=fake_paper_id(query, index),
+            day=index % 28 + 1,
+            title=escape(f"{words.title()} study {index}"),
+            summary=escape(f"We study {words} from angle {index}. " * 4),
+            author_a=index % 97,
+            author_b=index % 89
+        ))
+    parts.append("</feed>\n")
+    return "".join(parts)
+
+
+class FakeArxivHandler(BaseHTTPRequestHandler):
+    server: "FakeArxivServer"
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        query = params.get("search_query", [""])[0]
+        start = int(params.get("start", ["0"])[0])
+        count = int(params.get("max_results", ["10"])[0])
+        self.server.record_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        body = render_feed(query, start, count, self.server.total_results).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeArxivServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.0, total_results: int = 1000):
+        super().__init__(address, FakeArxivHandler)
+        self.latency = latency
+        self.total_results = total_results
+        self.request_times = []
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.request_times.append(time.monotonic())
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/query"
+
+
+def start_fake_arxiv(port: int = 0, latency: float = 0.0, total_results: int = 1000) -> FakeArxivServer:
+    """Start a fake arXiv API on a background thread; use `.url` and `.shutdown()`."""
+    server = FakeArxivServer(("127.0.0.1", port), latency=latency, total_results=total_results)
+    threading.Thread(target=server.serve_forever, name="fake-arxiv", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--total-results", type=int, default=1000)
+    args = parser.parse_args()
+
+    server = FakeArxivServer(("127.0.0.1", args.port), latency=args.latency, total_results=args.total_results)
+    print(f"Fake arXiv API listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,369 @@
+"""End-to-end latency benchmark for the research server and chatbot.
+
+For each corpus size the harness seeds a temporary paper store, starts
+research_server.py over stdio against the fake arXiv feed, and measures:
+
+- spawn: process start until the MCP initialize handshake completes
+- handshake: listing tools, prompts and resources (what the chatbot does on connect)
+- tool:<name>: one call of each tool
+- resource:<name>: papers://folders and pages of papers://{topic}
+- query: MCP_ChatBot.process_query with a scripted LLM that calls
+  search_papers, then extract_info, then answers
+- <transport>:connect/ping/extract_info: with --transports, the same server
+  reached over stdio, SSE and streamable HTTP through the chatbot's ServerPool
+  (keep-alive HTTP connections), for the first corpus size only
+
+Run:
+    python -m benchmarks.latency --sizes 10,1000,100000 --iterations 20
+    python -m benchmarks.latency --sizes 1000 --transports stdio,sse,streamable-http
+Save a baseline, or check against one (exits 1 on a p95 regression):
+    python -m benchmarks.latency --save benchmarks/baselines/latency.json
+    python -m benchmarks.latency --baseline benchmarks/baselines/latency.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, List
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from benchmarks.fake_arxiv import start_fake_arxiv
+from benchmarks.mock_llm import ScriptedLLM, tool_call
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAPERS_PER_TOPIC = 1000
+# research_server.py's __main__ serves SSE; run it over stdio with per-request logging off
+SERVER_COMMAND = (
+    "import logging, research_server; logging.getLogger().setLevel(logging.WARNING); "
+    "research_server.mcp.run(transport='stdio')"
+)
+# Both HTTP transports on one port: SSE at /sse, streamable HTTP at /mcp
+HTTP_SERVER_COMMAND = (
+    "import logging, research_server; logging.getLogger().setLevel(logging.WARNING); "
+    "research_server.mcp.settings.port = {port}; research_server.mcp.settings.log_level = 'WARNING'; "
+    "research_server.serve('both')"
+)
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+
+
+def summarize(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pct(50),
+        "p95": pct(95),
+        "p99": pct(99)
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"Server did not listen on port {port} within {timeout:g}s")
+
+
+def seeded_paper_id(index: int) -> str:
+    """ID of the index-th seeded paper: unique per index, and outside the fake feed's 2000-2499 range."""
+    return f"{2500 + index // 100000:04d}.{index % 100000:05d}"
+
+
+def seed_corpus(paper_dir: str, size: int) -> List[str]:
+    """Write `size` synthetic papers through the paper store and search index; return the topics."""
+    sys.path.insert(0, REPO_DIR)
+    from local_search import BM25Index
+    from paper_store import open_paper_store
+
+    topics = {}
+    for index in range(size):
+        topic = f"bench_topic_{index // PAPERS_PER_TOPIC}"
+        paper_id = seeded_paper_id(index)
+        topics.setdefault(topic, {})[paper_id] = {
+            "title": f"Benchmark paper {index} on {topic.replace('_', ' ')}",
+            "authors": [f"Author {index % 97}", f"Author {index % 89}"],
+            "summary": f"Synthetic abstract {index} about retrieval, agents and {topic}. " * 3,
+            "pdf_url": f"http://arxiv.org/pdf/{paper_id}v1",
+            "published": f"2024-01-{index % 28 + 1:02d}"
+        }
+    store = open_paper_store("sqlite", paper_dir)
+    store.upsert_many(topics)
+    BM25Index(paper_dir).add_papers({
+        paper_id: info for papers in topics.values() for paper_id, info in papers.items()
+    })
+    return list(topics)
+
+
+def server_config(paper_dir: str, arxiv_url: str) -> dict:
+    return {
+        "command": sys.executable,
+        "args": ["-c", SERVER_COMMAND],
+        "cwd": REPO_DIR,
+        "env": {
+            "PAPER_DIR": paper_dir,
+            "PAPER_STORE": "sqlite",
+            "ARXIV_API_URL": arxiv_url,
+            "ARXIV_MIN_INTERVAL": "0"
+        }
+    }
+
+
+async def measure_server(config: dict, topics: List[str], size: int,
+                         spawns: int, iterations: int, samples: Dict[str, List[float]]) -> None:
+    rng = random.Random(size)
+
+    for _ in range(spawns):
+        async with AsyncExitStack() as stack:
+            started = time.perf_counter()
+            read, write = await stack.enter_async_context(stdio_client(StdioServerParameters(**config)))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            samples["spawn"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await session.list_tools()
+            await session.list_prompts()
+            await session.list_resources()
+            samples["handshake"].append(time.perf_counter() - started)
+
+    async with AsyncExitStack() as stack:
+        read, write = await stack.enter_async_context(stdio_client(StdioServerParameters(**config)))
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+
+        async def timed(name: str, call) -> None:
+            started = time.perf_counter()
+            result = await call
+            samples[name].append(time.perf_counter() - started)
+            if getattr(result, "isError", False):
+                raise RuntimeError(f"{name} failed: {result.content}")
+
+        for iteration in range(iterations):
+            topic = rng.choice(topics)
+            paper = rng.randrange(size)
+            paper_id = seeded_paper_id(paper)
+            await timed("tool:search_papers", session.call_tool(
+                "search_papers", {"topic": f"bench query {size} {iteration}", "max_results": 5}))
+            await timed("tool:extract_info", session.call_tool("extract_info", {"paper_id": paper_id}))
+            await timed("tool:search_local", session.call_tool(
+                "search_local", {"query": f"abstract {paper} retrieval", "k": 10}))
+            await timed("resource:folders", session.read_resource("papers://folders"))
+            await timed("resource:topic", session.read_resource(f"papers://{topic}"))
+            await timed("resource:topic_page", session.read_resource(f"papers://{topic}?page=3&page_size=50"))
+
+
+async def measure_query(config: dict, size: int, iterations: int, samples: Dict[str, List[float]],
+                        manifest_path: str) -> None:
+    sys.path.insert(0, REPO_DIR)
+    os.environ.setdefault("DIAL_API_KEY", "benchmark")
+    from mcp_chatbot import MCP_ChatBot
+    from server_manifest import ServerManifest
+
+    def script(query: str) -> list:
+        paper = int(query.split()[-1]) % size
+        return [
+            [tool_call("search_papers", topic=query, max_results=5)],
+            [tool_call("extract_info", paper_id=seeded_paper_id(paper))],
+            "Here is a summary of the papers."
+        ]
+
+    chatbot = MCP_ChatBot()
+    chatbot.llm = ScriptedLLM(script)
+    chatbot.manifest = ServerManifest(manifest_path)
+    chatbot.lazy_spawn = False
+
+    async def discard(text: str) -> None:
+        pass
+
+    # The chatbot narrates every step; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            await chatbot.connect_to_server("research", config)
+            for iteration in range(iterations):
+                started = time.perf_counter()
+                await chatbot.process_query(f"benchmark query {size} {iteration}", on_text=discard)
+                samples["query"].append(time.perf_counter() - started)
+        finally:
+            await chatbot.cleanup()
+
+
+async def measure_transports(transports: List[str], config: dict, size: int, spawns: int, iterations: int,
+                             samples: Dict[str, List[float]]) -> None:
+    """Connect and call round trips per transport, through ServerPool as the chatbot does."""
+    sys.path.insert(0, REPO_DIR)
+    from server_pool import ServerPool
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-c", HTTP_SERVER_COMMAND.format(port=port)], cwd=REPO_DIR,
+        env=dict(os.environ, **config["env"]), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    configs = {
+        "stdio": config,
+        "sse": {"url": f"http://127.0.0.1:{port}/sse"},
+        "streamable-http": {"url": f"http://127.0.0.1:{port}/mcp"}
+    }
+    rng = random.Random(size)
+    try:
+        await wait_for_port(port)
+        for transport in transports:
+            for spawn in range(spawns):
+                pool = ServerPool(transport, configs[transport], ping_interval=3600)
+                try:
+                    started = time.perf_counter()
+                    if not await pool.start():
+                        raise RuntimeError(f"Could not connect over {transport}")
+                    samples[f"{transport}:connect"].append(time.perf_counter() - started)
+                    if spawn < spawns - 1:
+                        continue
+                    session = pool.session()
+                    for _ in range(iterations):
+                        started = time.perf_counter()
+                        await session.send_ping()
+                        samples[f"{transport}:ping"].append(time.perf_counter() - started)
+                        paper = rng.randrange(size)
+                        paper_id = seeded_paper_id(paper)
+                        started = time.perf_counter()
+                        await session.call_tool("extract_info", {"paper_id": paper_id})
+                        samples[f"{transport}:extract_info"].append(time.perf_counter() - started)
+                finally:
+                    await pool.close()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+async def run_size(size: int, spawns: int, iterations: int, arxiv_url: str,
+                   transports: List[str] = ()) -> Dict[str, dict]:
+    paper_dir = tempfile.mkdtemp(prefix=f"bench_{size}_")
+    try:
+        started = time.perf_counter()
+        topics = seed_corpus(paper_dir, size)
+        print(f"\n== {size} papers in {len(topics)} topics (seeded in {time.perf_counter() - started:.1f}s)")
+
+        config = server_config(paper_dir, arxiv_url)
+        samples: Dict[str, List[float]] = {
+            name: [] for name in (
+                "spawn", "handshake", "tool:search_papers", "tool:extract_info", "tool:search_local",
+                "resource:folders", "resource:topic", "resource:topic_page", "query"
+            )
+        }
+        await measure_server(config, topics, size, spawns, iterations, samples)
+        await measure_query(config, size, iterations, samples, os.path.join(paper_dir, "manifest.json"))
+        for transport in transports:
+            for name in ("connect", "ping", "extract_info"):
+                samples[f"{transport}:{name}"] = []
+        if transports:
+            await measure_transports(transports, config, size, spawns, iterations, samples)
+        return {name: summarize(values) for name, values in samples.items() if values}
+    finally:
+        shutil.rmtree(paper_dir, ignore_errors=True)
+
+
+def print_table(size: int, results: Dict[str, dict], baseline: Dict[str, dict]) -> None:
+    print(f"{'metric':<30}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'base p95':>10}")
+    for name, stats in results.items():
+        base = baseline.get(name, {}).get("p95")
+        print(f"{name:<30}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}"
+              + (f"{base * 1000:>10.1f}" if base is not None else f"{'-':>10}"))
+
+
+def regressions(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]],
+                tolerance: float, floor: float) -> List[str]:
+    """Metrics whose p95 exceeds the baseline p95 by more than `tolerance` times and `floor` seconds."""
+    found = []
+    for size, metrics in results.items():
+        for name, stats in metrics.items():
+            base = baseline.get(size, {}).get(name)
+            if base and stats["p95"] > base["p95"] * tolerance and stats["p95"] - base["p95"] > floor:
+                found.append(f"{size} papers {name}: p95 {stats['p95'] * 1000:.1f}ms "
+                             f"vs baseline {base['p95'] * 1000:.1f}ms")
+    return found
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma-separated corpus sizes")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--spawns", type=int, default=3)
+    parser.add_argument("--arxiv-latency", type=float, default=0.0, help="seconds added by the fake arXiv")
+    parser.add_argument("--transports", default="",
+                        help=f"compare transports on the first size, e.g. {','.join(TRANSPORTS)}")
+    parser.add_argument("--save", help="write results to this baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed p95 ratio over baseline")
+    parser.add_argument("--floor", type=float, default=0.005, help="ignore p95 increases below this many seconds")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+    transports = [transport for transport in args.transports.split(",") if transport]
+    for transport in transports:
+        if transport not in TRANSPORTS:
+            parser.error(f"unknown transport {transport!r}, expected one of {', '.join(TRANSPORTS)}")
+
+    arxiv = start_fake_arxiv(latency=args.arxiv_latency)
+    results = {}
+    try:
+        for index, size in enumerate([int(size) for size in args.sizes.split(",")]):
+            results[str(size)] = await run_size(size, args.spawns, args.iterations, arxiv.url,
+                                                transports if index == 0 else [])
+            print_table(size, results[str(size)], baseline.get(str(size), {}))
+    finally:
+        arxiv.shutdown()
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as baseline_file:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "iterations": args.iterations,
+                "results": results
+            }, baseline_file, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if baseline:
+        found = regressions(results, baseline, args.tolerance, args.floor)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,249 @@
+"""Load generator for the research server's SSE transport.
+
+Opens N concurrent MCP SSE sessions. Each session sends a weighted mix of
+search_papers, extract_info, papers://folders and papers://{topic} requests,
+paced so that all sessions together hold the target rate. The load is open
+loop: every request is sent at its scheduled time whether or not earlier ones
+have answered, and latency is measured from that scheduled time, so queueing
+delay shows up in the percentiles. Reports throughput against the target,
+latency percentiles and error rates per request type, plus the server's
+resident memory.
+
+By default the server is started locally against the fake arXiv feed and a
+seeded corpus, so nothing leaves the machine:
+    python -m benchmarks.loadgen --sessions 20 --rate 50 --duration 30
+    python -m benchmarks.loadgen --mix search_papers=1,extract_info=4,folders=2,topic=3
+Point it at a running server instead (memory is then not reported):
+    python -m benchmarks.loadgen --url http://127.0.0.1:8001/sse
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from benchmarks.fake_arxiv import start_fake_arxiv
+from benchmarks.latency import PAPERS_PER_TOPIC, REPO_DIR, free_port, seed_corpus, seeded_paper_id, summarize, wait_for_port
+
+DEFAULT_MIX = "search_papers=1,extract_info=4,folders=2,topic=3"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("search_papers", "extract_info", "folders", "topic"):
+            raise ValueError(f"Unknown request type in mix: {name}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process in MB, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def start_server(port: int, paper_dir: str, arxiv_url: str, min_interval: float) -> subprocess.Popen:
+    command = (
+        "import logging, research_server; logging.getLogger().setLevel(logging.WARNING); "
+        f"research_server.mcp.settings.port = {port}; research_server.mcp.run(transport='sse')"
+    )
+    env = dict(os.environ, PAPER_DIR=paper_dir, ARXIV_API_URL=arxiv_url, ARXIV_MIN_INTERVAL=str(min_interval))
+    return subprocess.Popen([sys.executable, "-c", command], cwd=REPO_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class LoadGenerator:
+    def __init__(self, url: str, sessions: int, rate: float, duration: float, mix: Dict[str, float],
+                 corpus_size: int, timeout: float, seed: int = 0):
+        self.url = url
+        self.sessions = sessions
+        self.rate = rate
+        self.duration = duration
+        self.mix = mix
+        self.corpus_size = corpus_size
+        self.timeout = timeout
+        self.seed = seed
+        self.latencies: Dict[str, List[float]] = {name: [] for name in mix}
+        self.errors: Dict[str, int] = {name: 0 for name in mix}
+        self.error_samples: List[str] = []
+        self.connect_failures = 0
+        self.sent = 0
+        # Worst delay between a request's scheduled and actual send (generator overload)
+        self.max_send_lag = 0.0
+
+    def _request(self, session: ClientSession, kind: str, rng: random.Random, counter: int):
+        paper = rng.randrange(max(1, self.corpus_size))
+        topic = f"bench_topic_{paper // PAPERS_PER_TOPIC}"
+        if kind == "search_papers":
+            # Mostly repeated topics, like real traffic, so the query cache sees some hits
+            return session.call_tool("search_papers", {"topic": f"load topic {rng.randrange(50)}", "max_results": 5})
+        if kind == "extract_info":
+            return session.call_tool("extract_info", {"paper_id": seeded_paper_id(paper)})
+        if kind == "folders":
+            return session.read_resource("papers://folders")
+        return session.read_resource(f"papers://{topic}?page={counter % 5 + 1}")
+
+    async def _issue(self, kind: str, request, scheduled: float) -> None:
+        try:
+            result = await asyncio.wait_for(request, self.timeout)
+            if getattr(result, "isError", False):
+                raise RuntimeError(result.content[0].text if result.content else "tool error")
+            self.latencies[kind].append(time.monotonic() - scheduled)
+        except Exception as e:
+            self.errors[kind] += 1
+            if len(self.error_samples) < 5:
+                self.error_samples.append(f"{kind}: {e!r}")
+
+    async def _session(self, index: int, deadline: float) -> None:
+        rng = random.Random(self.seed * 1000 + index)
+        kinds = list(self.mix)
+        weights = [self.mix[kind] for kind in kinds]
+        interval = self.sessions / self.rate
+        try:
+            async with sse_client(self.url) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    # Spread the sessions' first requests over one interval
+                    next_send = time.monotonic() + rng.random() * interval
+                    counter = 0
+                    in_flight = set()
+                    while next_send < deadline:
+                        await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+                        self.max_send_lag = max(self.max_send_lag, time.monotonic() - next_send)
+                        kind = rng.choices(kinds, weights)[0]
+                        # Open loop: each request runs as its own task, so a slow response
+                        # doesn't push back the schedule
+                        task = asyncio.create_task(
+                            self._issue(kind, self._request(session, kind, rng, counter), next_send))
+                        in_flight.add(task)
+                        task.add_done_callback(in_flight.discard)
+                        self.sent += 1
+                        counter += 1
+                        next_send += interval
+                    if in_flight:
+                        await asyncio.gather(*in_flight)
+        except Exception as e:
+            self.connect_failures += 1
+            if len(self.error_samples) < 5:
+                self.error_samples.append(f"session {index}: {e!r}")
+
+    async def run(self) -> float:
+        started = time.monotonic()
+        deadline = started + self.duration
+        await asyncio.gather(*[self._session(index, deadline) for index in range(self.sessions)])
+        return time.monotonic() - started
+
+
+async def sample_memory(pid: int, samples: List[float], interval: float = 0.5) -> None:
+    while True:
+        value = rss_mb(pid)
+        if value is not None:
+            samples.append(value)
+        await asyncio.sleep(interval)
+
+
+def report(load: LoadGenerator, elapsed: float, memory: List[float]) -> dict:
+    completed = sum(len(values) for values in load.latencies.values())
+    errors = sum(load.errors.values())
+    result = {
+        "sessions": load.sessions,
+        "target_rate": load.rate,
+        "elapsed": elapsed,
+        "completed": completed,
+        "errors": errors,
+        "connect_failures": load.connect_failures,
+        "sent": load.sent,
+        "send_rate": load.sent / load.duration,
+        "throughput": completed / elapsed if elapsed else 0.0,
+        "max_send_lag": load.max_send_lag,
+        "requests": {},
+        "memory_mb": {"start": memory[0], "peak": max(memory), "end": memory[-1]} if memory else None
+    }
+    print(f"\n{load.sessions} sessions, target {load.rate:g} req/s, {elapsed:.1f}s")
+    print(f"{'request':<16}{'ok':>8}{'err':>6}{'err %':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for kind, values in load.latencies.items():
+        total = len(values) + load.errors[kind]
+        stats = summarize(values) if values else None
+        result["requests"][kind] = {"ok": len(values), "errors": load.errors[kind], "latency": stats}
+        print(f"{kind:<16}{len(values):>8}{load.errors[kind]:>6}"
+              f"{(100 * load.errors[kind] / total if total else 0):>7.1f}"
+              + (f"{stats['p50'] * 1000:>9.1f}{stats['p95'] * 1000:>9.1f}{stats['p99'] * 1000:>9.1f}"
+                 if stats else f"{'-':>9}{'-':>9}{'-':>9}"))
+    print(f"sent {load.sent} at {result['send_rate']:.1f} req/s (target {load.rate:g}), "
+          f"throughput {result['throughput']:.1f} req/s, errors {errors}, failed sessions {load.connect_failures}")
+    if load.max_send_lag > 0.1:
+        print(f"WARNING: target rate not held (send lag up to {load.max_send_lag * 1000:.0f} ms); "
+              "the load generator itself is saturated")
+    if memory:
+        print(f"server RSS start {memory[0]:.0f} MB, peak {max(memory):.0f} MB, end {memory[-1]:.0f} MB")
+    for sample in load.error_samples:
+        print(f"  e.g. {sample}")
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="SSE endpoint of a running server (default: start one locally)")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=20, help="target requests per second over all sessions")
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted request mix")
+    parser.add_argument("--corpus", type=int, default=10000, help="papers to seed the local server with")
+    parser.add_argument("--arxiv-latency", type=float, default=0.2, help="seconds added by the fake arXiv")
+    parser.add_argument("--min-interval", type=float, default=0.0, help="ARXIV_MIN_INTERVAL for the local server")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a request counts as failed")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    load = LoadGenerator(args.url, args.sessions, args.rate, args.duration, parse_mix(args.mix),
+                         args.corpus, args.timeout)
+    memory: List[float] = []
+    server = arxiv = paper_dir = sampler = None
+    try:
+        if not args.url:
+            paper_dir = tempfile.mkdtemp(prefix="loadgen_")
+            seed_corpus(paper_dir, args.corpus)
+            arxiv = start_fake_arxiv(latency=args.arxiv_latency)
+            port = free_port()
+            server = start_server(port, paper_dir, arxiv.url, args.min_interval)
+            await wait_for_port(port)
+            load.url = f"http://127.0.0.1:{port}/sse"
+            sampler = asyncio.create_task(sample_memory(server.pid, memory))
+            print(f"Started research server on port {port} with {args.corpus} papers")
+
+        elapsed = await load.run()
+        result = report(load, elapsed, memory)
+        if args.json:
+            with open(args.json, "w") as report_file:
+                json.dump(result, report_file, indent=2)
+    finally:
+        if sampler:
+            sampler.cancel()
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        if arxiv:
+            arxiv.shutdown()
+        if paper_dir:
+            shutil.rmtree(paper_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""Scripted stand-in for the streaming OpenAI chat client.
+
+`ScriptedLLM` replays a fixed sequence of turns for every query: each turn is
+either a list of tool calls or the final answer text. It plugs into
+`MCP_ChatBot.llm`, so `process_query` can be benchmarked without a network.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Callable, List, Union
+
+
+def tool_call(name: str, **arguments) -> dict:
+    return {"name": name, "arguments": arguments}
+
+
+def _chunk(content=None, tool_calls=None, usage=None):
+    choices = [] if content is None and tool_calls is None else [
+        SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls))
+    ]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class _Stream:
+    def __init__(self, chunks: list, ttft: float, latency: float):
+        self.chunks = chunks
+        self.ttft = ttft
+        self.latency = latency
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        if self.ttft:
+            await asyncio.sleep(self.ttft)
+        for chunk in self.chunks:
+            yield chunk
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class ScriptedLLM:
+    """Replays `script` for each query.
+
+    `script` is a list of turns, or a callable that builds one from the user
+    query. A turn is a list of `tool_call(...)` dicts or a string (the final
+    answer). The turn to play is the number of assistant messages since the
+    last user message, so concurrent conversations replay independently.
+    `ttft` and `latency` add a delay before the first chunk and after the last.
+    """
+
+    def __init__(self, script: Union[List, Callable[[str], List]], ttft: float = 0.0, latency: float = 0.0):
+        self.script = script
+        self.ttft = ttft
+        self.latency = latency
+        self.requests = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, messages: list, stream: bool = True, **kwargs) -> _Stream:
+        self.requests += 1
+        last_user = max(i for i, message in enumerate(messages) if message["role"] == "user")
+        step = sum(1 for message in messages[last_user:] if message["role"] == "assistant")
+        script = self.script(messages[last_user]["content"]) if callable(self.script) else self.script
+        turn = script[min(step, len(script) - 1)]
+
+        if isinstance(turn, str):
+            chunks = [_chunk(content=turn)]
+        else:
+            chunks = [
+                _chunk(tool_calls=[SimpleNamespace(
+                    index=index,
+                    id=f"call_{self.requests}_{index}",
+                    function=SimpleNamespace(name=call["name"], arguments=json.dumps(call["arguments"]))
+                )])
+                for index, call in enumerate(turn)
+            ]
+        prompt_chars = sum(len(str(message.get("content") or "")) for message in messages)
+        chunks.append(_chunk(usage=SimpleNamespace(prompt_tokens=prompt_chars // 4, completion_tokens=len(chunks))))
+        return _Stream(chunks, self.ttft, self.latency)
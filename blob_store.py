@@ -0,0 +1,104 @@
+import hashlib
+import os
+import re
+import time
+from typing import Optional
+
+
+class BlobStore:
+    """Local, content-addressed store for oversized tool results.
+
+    `put` writes text under a short handle derived from its SHA-256, so the
+    same payload is stored once. `read` returns a slice of a stored blob by
+    offset, or the passages around matches of a search string.
+
+    The store is bounded: blobs older than `max_age` seconds are removed, and
+    the least recently stored ones go once the total exceeds `max_bytes`.
+    Pruning runs on start-up and after each new blob.
+    """
+
+    def __init__(self, root: str = ".mcp_blobs", max_bytes: int = 256 * 1024 * 1024, max_age: float = 86400):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.prune()
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.root, f"{handle}.txt")
+
+    def put(self, text: str) -> str:
+        handle = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        path = self._path(handle)
+        if os.path.exists(path):
+            # Stored again: count it as recent so pruning keeps it
+            os.utime(path)
+        else:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as blob_file:
+                blob_file.write(text)
+            os.replace(tmp_path, path)
+            self.prune(keep=path)
+        return handle
+
+    def prune(self, keep: Optional[str] = None) -> int:
+        """Remove expired blobs, then the oldest until under `max_bytes`; return how many went."""
+        try:
+            names = [name for name in os.listdir(self.root) if name.endswith(".txt")]
+        except FileNotFoundError:
+            return 0
+        blobs = []
+        for name in names:
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+        blobs.sort()
+
+        cutoff = time.time() - self.max_age
+        total = sum(size for _, size, _ in blobs)
+        removed = 0
+        for mtime, size, path in blobs:
+            if path == keep or (mtime >= cutoff and total <= self.max_bytes):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def read(self, handle: str, offset: int = 0, length: int = 2000,
+             search: Optional[str] = None, max_matches: int = 5) -> dict:
+        """Return a chunk of a blob, or up to `max_matches` passages around `search`."""
+        if not re.fullmatch(r"[0-9a-f]{16}", handle or ""):
+            return {"error": f"Invalid handle: {handle}"}
+        try:
+            with open(self._path(handle), "r", encoding="utf-8") as blob_file:
+                text = blob_file.read()
+        except FileNotFoundError:
+            return {"error": f"No stored output with handle {handle}"}
+
+        if search:
+            context = max(100, length // 2)
+            matches = []
+            for match in re.finditer(re.escape(search), text, re.IGNORECASE):
+                start = max(0, match.start() - context)
+                matches.append({"offset": start, "text": text[start:match.end() + context]})
+                if len(matches) >= max_matches:
+                    break
+            return {"handle": handle, "total_chars": len(text), "matches": matches}
+
+        offset = max(0, offset)
+        chunk = text[offset:offset + length]
+        end = offset + len(chunk)
+        return {
+            "handle": handle,
+            "total_chars": len(text),
+            "offset": offset,
+            "text": chunk,
+            "next_offset": end if end < len(text) else None
+        }
@@ -0,0 +1,102 @@
+import json
+from typing import Any, List, Tuple
+
+
+# Rough average for English text and JSON with the GPT/Claude tokenizers
+CHARS_PER_TOKEN = 4
+# Per-message framing overhead (role, separators)
+MESSAGE_OVERHEAD = 4
+
+
+def content_text(content: Any) -> str:
+    """Flatten message content (str, MCP content blocks, dicts) into plain text."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(content_text(item) for item in content)
+    if hasattr(content, "text"):
+        return content.text
+    if isinstance(content, dict):
+        return content.get("text") or json.dumps(content, default=str)
+    return str(content)
+
+
+def estimate_tokens(message: dict) -> int:
+    """Estimate the prompt tokens one chat message costs."""
+    chars = len(content_text(message.get("content")))
+    for tc in message.get("tool_calls") or []:
+        chars += len(tc["function"]["name"]) + len(tc["function"]["arguments"])
+    return MESSAGE_OVERHEAD + chars // CHARS_PER_TOKEN
+
+
+class ContextBudget:
+    """Keeps a conversation's messages under a token budget.
+
+    Messages are grouped into units: a user message, or an assistant message
+    together with the tool results answering its tool calls, so a call and its
+    result are never separated. The first unit (the original request), the
+    latest user message (the question being answered) and the newest
+    `keep_recent` units are left intact. Other units, including tool calls made
+    for the current question, are first compacted (tool results and long text
+    cut to a short preview), then dropped oldest first if the conversation is
+    still over budget.
+    """
+
+    def __init__(self, max_tokens: int = 16000, keep_recent: int = 2, preview_chars: int = 400):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.preview_chars = preview_chars
+
+    @staticmethod
+    def _units(messages: List[dict]) -> List[List[dict]]:
+        units = []
+        for message in messages:
+            if message.get("role") == "tool" and units and units[-1][0].get("tool_calls"):
+                units[-1].append(message)
+            else:
+                units.append([message])
+        return units
+
+    def _compact(self, message: dict) -> dict:
+        text = content_text(message.get("content"))
+        if len(text) <= self.preview_chars:
+            return message
+        omitted = (len(text) - self.preview_chars) // CHARS_PER_TOKEN
+        compacted = dict(message)
+        compacted["content"] = f"{text[:self.preview_chars]}... [compacted: ~{omitted} tokens omitted]"
+        return compacted
+
+    def fit(self, messages: List[dict]) -> Tuple[List[dict], int]:
+        """Return (messages within budget, estimated tokens saved)."""
+        before = sum(estimate_tokens(message) for message in messages)
+        if before <= self.max_tokens:
+            return messages, 0
+
+        units = self._units(messages)
+        protected_tail = max(1, len(units) - self.keep_recent)
+        # In a continued conversation the current question may sit further back than keep_recent
+        last_user = max((index for index, unit in enumerate(units) if unit[0].get("role") == "user"), default=0)
+        total = before
+
+        # Compact older units, oldest first
+        for index in range(1, protected_tail):
+            if total <= self.max_tokens:
+                break
+            if index == last_user:
+                continue
+            compacted = [self._compact(message) for message in units[index]]
+            total -= sum(estimate_tokens(m) for m in units[index]) - sum(estimate_tokens(m) for m in compacted)
+            units[index] = compacted
+
+        # Still over: drop older units whole
+        kept = [units[0]]
+        for index in range(1, len(units)):
+            if index < protected_tail and index != last_user and total > self.max_tokens:
+                total -= sum(estimate_tokens(message) for message in units[index])
+                continue
+            kept.append(units[index])
+
+        fitted = [message for unit in kept for message in unit]
+        return fitted, before - total
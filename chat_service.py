@@ -0,0 +1,254 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from mcp_chatbot import MCP_ChatBot
+
+# Queries one tenant may run at once, and how many more may wait before it gets 429s
+TENANT_CONCURRENCY = int(os.getenv("CHAT_TENANT_CONCURRENCY", "4"))
+TENANT_QUEUE = int(os.getenv("CHAT_TENANT_QUEUE", "8"))
+# Conversations idle for longer than this are forgotten
+CONVERSATION_TTL = float(os.getenv("CHAT_CONVERSATION_TTL", "3600"))
+TENANT_HEADER = "x-tenant-id"
+
+
+class Overloaded(Exception):
+    """A tenant already has as many queries running and queued as it may."""
+
+
+class TenantLimiter:
+    """Per-tenant cap on running queries, with a bounded wait queue.
+
+    A tenant runs at most `max_active` queries at a time. Up to `max_queued`
+    more wait for a slot; beyond that `slot` raises Overloaded right away so
+    the caller can answer 429 instead of piling up work. A tenant's state is
+    dropped once it has nothing running or waiting, so arbitrary tenant IDs
+    don't accumulate.
+    """
+
+    def __init__(self, max_active: int = 4, max_queued: int = 8):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self, tenant: str):
+        semaphore = self._slots.setdefault(tenant, asyncio.Semaphore(self.max_active))
+        if semaphore.locked() and self._waiting[tenant] >= self.max_queued:
+            self.rejected += 1
+            raise Overloaded(tenant)
+        self._waiting[tenant] += 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            self._waiting[tenant] -= 1
+            self._forget_if_idle(tenant, semaphore)
+            raise
+        self._waiting[tenant] -= 1
+        try:
+            yield
+        finally:
+            semaphore.release()
+            self._forget_if_idle(tenant, semaphore)
+
+    def _forget_if_idle(self, tenant: str, semaphore: asyncio.Semaphore) -> None:
+        if semaphore._value == self.max_active and not self._waiting[tenant]:
+            self._slots.pop(tenant, None)
+            self._waiting.pop(tenant, None)
+
+    def stats(self) -> dict:
+        return {
+            tenant: {
+                "active": self.max_active - semaphore._value,
+                "waiting": self._waiting[tenant]
+            }
+            for tenant, semaphore in self._slots.items()
+        }
+
+
+class Conversation:
+    def __init__(self, tenant: str):
+        self.id = uuid.uuid4().hex
+        self.tenant = tenant
+        self.messages: list = []
+        # Turns of one conversation run one after the other
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class ChatService:
+    """Many concurrent conversations over one MCP_ChatBot.
+
+    Every conversation keeps its own `messages`; the MCP server pools, the
+    LLM client and the tool cache are shared by all of them.
+    """
+
+    def __init__(self, chatbot: Optional[MCP_ChatBot] = None):
+        self.chatbot = chatbot or MCP_ChatBot()
+        self.limiter = TenantLimiter(TENANT_CONCURRENCY, TENANT_QUEUE)
+        self.conversations: Dict[str, Conversation] = {}
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - CONVERSATION_TTL
+        for conversation_id in [cid for cid, c in self.conversations.items()
+                                if c.last_used < cutoff and not c.lock.locked()]:
+            del self.conversations[conversation_id]
+
+    def create_conversation(self, tenant: str) -> Conversation:
+        self._expire()
+        conversation = Conversation(tenant)
+        self.conversations[conversation.id] = conversation
+        return conversation
+
+    def get_conversation(self, tenant: str, conversation_id: str) -> Optional[Conversation]:
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None or conversation.tenant != tenant:
+            return None
+        return conversation
+
+    async def ask(self, conversation: Conversation, query: str, on_text=None) -> str:
+        """Run one turn of a conversation under its tenant's limit."""
+        async with self.limiter.slot(conversation.tenant):
+            async with conversation.lock:
+                conversation.last_used = time.monotonic()
+                answer = await self.chatbot.process_query(query, conversation.messages, on_text)
+                conversation.last_used = time.monotonic()
+                return answer
+
+
+def _tenant(request) -> str:
+    return request.headers.get(TENANT_HEADER, "default")
+
+
+def _overloaded(tenant: str) -> JSONResponse:
+    return JSONResponse(
+        {"error": f"Too many concurrent queries for tenant {tenant}"},
+        status_code=429,
+        headers={"Retry-After": "1"}
+    )
+
+
+def create_app(service: Optional[ChatService] = None) -> Starlette:
+    """Build the HTTP/WebSocket app. MCP servers are connected on startup."""
+    service = service or ChatService()
+
+    async def create(request: Request) -> JSONResponse:
+        conversation = service.create_conversation(_tenant(request))
+        return JSONResponse({"conversation_id": conversation.id}, status_code=201)
+
+    async def history(request: Request) -> JSONResponse:
+        conversation = service.get_conversation(_tenant(request), request.path_params["conversation_id"])
+        if conversation is None:
+            return JSONResponse({"error": "Unknown conversation"}, status_code=404)
+        return JSONResponse({"conversation_id": conversation.id, "messages": conversation.messages})
+
+    async def delete(request: Request) -> JSONResponse:
+        conversation = service.get_conversation(_tenant(request), request.path_params["conversation_id"])
+        if conversation is None:
+            return JSONResponse({"error": "Unknown conversation"}, status_code=404)
+        del service.conversations[conversation.id]
+        return JSONResponse({"deleted": conversation.id})
+
+    async def message(request: Request) -> JSONResponse:
+        tenant = _tenant(request)
+        conversation = service.get_conversation(tenant, request.path_params["conversation_id"])
+        if conversation is None:
+            return JSONResponse({"error": "Unknown conversation"}, status_code=404)
+        try:
+            body = await request.json()
+            query = body["query"]
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse({"error": "Expected a JSON body with a 'query' field"}, status_code=400)
+        try:
+            answer = await service.ask(conversation, query)
+        except Overloaded:
+            return _overloaded(tenant)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+        return JSONResponse({"conversation_id": conversation.id, "answer": answer})
+
+    async def health(request: Request) -> JSONResponse:
+        chatbot = service.chatbot
+        return JSONResponse({
+            "servers": {
+                name: len(pool.live_sessions()) for name, pool in chatbot.server_pools.items()
+            },
+            "conversations": len(service.conversations),
+            "tenants": service.limiter.stats(),
+            "rejected": service.limiter.rejected,
+            "tool_cache": chatbot.tool_cache.stats()
+        })
+
+    async def websocket(websocket: WebSocket) -> None:
+        """One conversation per socket.
+
+        Send {"query": "..."}; text streams back as {"type": "delta"} events,
+        followed by {"type": "answer"} or {"type": "error"}.
+        """
+        tenant = _tenant(websocket)
+        await websocket.accept()
+        conversation = service.create_conversation(tenant)
+        await websocket.send_json({"type": "conversation", "conversation_id": conversation.id})
+
+        async def on_text(text: str) -> None:
+            await websocket.send_json({"type": "delta", "text": text})
+
+        try:
+            while True:
+                data = await websocket.receive_json()
+                try:
+                    answer = await service.ask(conversation, data["query"], on_text)
+                    await websocket.send_json({"type": "answer", "text": answer})
+                except Overloaded:
+                    await websocket.send_json({"type": "error", "status": 429,
+                                               "error": f"Too many concurrent queries for tenant {tenant}"})
+                except (KeyError, TypeError):
+                    await websocket.send_json({"type": "error", "status": 400,
+                                               "error": "Expected a JSON message with a 'query' field"})
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    await websocket.send_json({"type": "error", "status": 500, "error": str(e)})
+        except WebSocketDisconnect:
+            service.conversations.pop(conversation.id, None)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await service.chatbot.connect_to_servers()
+        try:
+            yield
+        finally:
+            await service.chatbot.cleanup()
+
+    return Starlette(
+        routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/conversations", create, methods=["POST"]),
+            Route("/conversations/{conversation_id}", history, methods=["GET"]),
+            Route("/conversations/{conversation_id}", delete, methods=["DELETE"]),
+            Route("/conversations/{conversation_id}/messages", message, methods=["POST"]),
+            WebSocketRoute("/ws", websocket)
+        ],
+        lifespan=lifespan
+    )
+
+
+if __name__ == "__main__":
+    uvicorn.run(
+        create_app(),
+        host=os.getenv("CHAT_SERVICE_HOST", "127.0.0.1"),
+        port=int(os.getenv("CHAT_SERVICE_PORT", "8002"))
+    )
@@ -1,11 +1,14 @@
 from dotenv import load_dotenv
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
 from typing import List, Dict, TypedDict
 from contextlib import AsyncExitStack
 import json
 import asyncio
+import os
+import time
 
 load_dotenv()
 
@@ -19,74 +22,143 @@ class MCP_ChatBot:
     def __init__(self):
         # Initialize session and client objects
         self.exit_stack = AsyncExitStack() # new
-        self.anthropic = Anthropic()
+        self.anthropic = AsyncAnthropic()
         self.available_tools: List[ToolDefinition] = [] # new
         self.available_prompts = []
         self.sessions: Dict[str, ClientSession] = {} # new
+        # Each server's transport and session live in their own task until cleanup
+        self.server_tasks: Dict[str, asyncio.Task] = {}
+        self.server_stops: Dict[str, asyncio.Event] = {}
+        self.connect_timeout = float(os.getenv("MCP_CONNECT_TIMEOUT", "30"))
+        self.startup_times: Dict[str, float] = {}
+        # Time to first token and total time of each LLM completion
+        self.llm_timings: List[Dict[str, float]] = []
 
 
+    async def _run_server(self, server_name: str, server_config: dict,
+                          ready: asyncio.Future, stop: asyncio.Event) -> None:
+        """Own one server's stdio transport and session until `stop` is set.
+
+        The anyio contexts behind stdio_client must be exited by the task that
+        entered them, so every server gets a task of its own.
+        """
+        try:
+            async with AsyncExitStack() as stack:
+                server_params = StdioServerParameters(**server_config)
+                read, write = await stack.enter_async_context(stdio_client(server_params))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                ready.set_result(session)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"Server {server_name} stopped: {e}")
+
+    async def _stop_server(self, server_name: str) -> None:
+        self.server_stops[server_name].set()
+        task = self.server_tasks[server_name]
+        try:
+            await asyncio.wait_for(task, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print(f"Error stopping {server_name}: {e}")
+
     async def connect_to_server(self, server_name: str, server_config: dict) -> None:
         """Connect to a single MCP server."""
+        started = time.perf_counter()
+        timeout = float(server_config.get("connectTimeout", self.connect_timeout))
+        ready = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+        self.server_stops[server_name] = stop
+        self.server_tasks[server_name] = asyncio.create_task(
+            self._run_server(server_name, server_config, ready, stop)
+        )
+        self.exit_stack.push_async_callback(self._stop_server, server_name)
+
         try:
-            server_params = StdioServerParameters(**server_config)
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            ) # new
-            read, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read, write)
-            ) # new
-            await session.initialize()
-            
-            try:
-                # List available tools for this session
-                response = await session.list_tools()
-                tools = response.tools
-                print(f"\nConnected to {server_name} with tools:", [t.name for t in tools])
-            
-                for tool in tools: # new
-                    self.sessions[tool.name] = session
-                    self.available_tools.append({
-                        "name": tool.name,
-                        "description": tool.description, # type: ignore
-                        "input_schema": tool.inputSchema
-                    })
-                
-                # List available prompts
-                prompts_response = await session.list_prompts()
-                if prompts_response and prompts_response.prompts:
-                    for prompt in prompts_response.prompts:
-                        self.sessions[prompt.name] = session
-                        self.available_prompts.append({
-                            "name": prompt.name,
-                            "description": prompt.description,
-                            "arguments": prompt.arguments
-                        })
-                        
-                # List available resources
-                resource_responses = await session.list_resources()
-                if resource_responses and resource_responses.resources:
-                    for resource in resource_responses.resources:
-                        resource_uri = str(resource.uri)
-                        self.sessions[resource_uri] = session
-                        
-                
-            except Exception as e:
-                print(f"Error {e}")
-                
+            session = await asyncio.wait_for(asyncio.shield(ready), timeout)
+        except asyncio.TimeoutError:
+            print(f"Failed to connect to {server_name}: no handshake within {timeout:g}s")
+            self.server_tasks[server_name].cancel()
+            return
         except Exception as e:
             print(f"Failed to connect to {server_name}: {e}")
+            return
+
+        try:
+            # Listing counts against the same timeout as the handshake
+            remaining = max(0.0, timeout - (time.perf_counter() - started))
+            await asyncio.wait_for(self._register_capabilities(server_name, session), remaining)
+            self.startup_times[server_name] = time.perf_counter() - started
+        except asyncio.TimeoutError:
+            print(f"Failed to connect to {server_name}: capabilities not listed within {timeout:g}s")
+            await self._stop_server(server_name)
+        except Exception as e:
+            print(f"Error {e}")
+
+    async def _register_capabilities(self, server_name: str, session: ClientSession) -> None:
+        """List a server's tools, prompts and resources and route them to its session.
+
+        Nothing is registered until every listing has answered, so a server
+        that times out part way leaves no routes to its stopped session.
+        """
+        # List available tools for this session
+        response = await session.list_tools()
+        tools = response.tools
+        # List available prompts and resources; servers may implement neither
+        try:
+            prompts = (await session.list_prompts()).prompts
+        except McpError:
+            prompts = []
+        try:
+            resources = (await session.list_resources()).resources
+        except McpError:
+            resources = []
+
+        print(f"\nConnected to {server_name} with tools:", [t.name for t in tools])
+        for tool in tools: # new
+            self.sessions[tool.name] = session
+            self.available_tools.append({
+                "name": tool.name,
+                "description": tool.description, # type: ignore
+                "input_schema": tool.inputSchema
+            })
+
+        for prompt in prompts or []:
+            self.sessions[prompt.name] = session
+            self.available_prompts.append({
+                "name": prompt.name,
+                "description": prompt.description,
+                "arguments": prompt.arguments
+            })
+
+        for resource in resources or []:
+            resource_uri = str(resource.uri)
+            self.sessions[resource_uri] = session
 
     async def connect_to_servers(self): # new
-        """Connect to all configured MCP servers."""
+        """Connect to all configured MCP servers concurrently."""
         try:
             with open("server_config.json", "r") as file:
                 data = json.load(file)
             
             servers = data.get("mcpServers", {})
-            
-            for server_name, server_config in servers.items():
-                await self.connect_to_server(server_name, server_config)
+
+            started = time.perf_counter()
+            await asyncio.gather(*[
+                self.connect_to_server(server_name, server_config)
+                for server_name, server_config in servers.items()
+            ])
+            total = time.perf_counter() - started
+
+            per_server = ", ".join(
+                f"{name} {self.startup_times[name]:.2f}s" if name in self.startup_times else f"{name} failed"
+                for name in servers
+            )
+            print(f"\nStarted {len(self.startup_times)}/{len(servers)} servers in {total:.2f}s ({per_server})")
         except Exception as e:
             print(f"Error loading server configuration: {e}")
             raise
@@ -94,16 +166,28 @@ class MCP_ChatBot:
     async def process_query(self, query):
         messages = [{'role':'user', 'content':query}]
         while True:
-            response = self.anthropic.messages.create(max_tokens = 2024,
+            # Stream the response; text is printed as it arrives
+            started = time.perf_counter()
+            first_token = None
+            async with self.anthropic.messages.stream(max_tokens = 2024,
                                       model = 'claude-3-7-sonnet-20250219', 
                                       tools = self.available_tools,
-                                      messages = messages)
+                                      messages = messages) as stream:
+                async for event in stream:
+                    if event.type in ('text', 'input_json') and first_token is None:
+                        first_token = time.perf_counter() - started
+                    if event.type == 'text':
+                        print(event.text, end="", flush=True)
+                response = await stream.get_final_message()
+            total = time.perf_counter() - started
+            self.llm_timings.append({"ttft": first_token if first_token is not None else total, "total": total})
+            print(f"\n[llm] first token {self.llm_timings[-1]['ttft']:.2f}s, complete {total:.2f}s")
+
             assistant_content = []
             has_tool_use = False
             
             for content in response.content:
                 if content.type =='text':
-                    print(content.text)
                     assistant_content.append(content)
                 elif content.type == 'tool_use':
                     has_tool_use = True
@@ -202,6 +286,7 @@ class MCP_ChatBot:
         print("Type your queries or 'quit' to exit.")
         print("Use @folders to see available topics")
         print("Use @<topic> to search papers in that topic")
+        print("Use @<topic>?page=<n> to see more papers in a large topic")
         print("Use /prompts to list available prompts")
         print("Use /prompt <name> <arg1=value1> to execute a prompt")
         
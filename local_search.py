@@ -0,0 +1,140 @@
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List
+
+from paper_store import open_paper_store
+
+
+INDEX_DB_FILE = "search_index.db"
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Common English words that carry no ranking signal
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were "
+    "we with our which these their can via using based".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index over stored papers with BM25 ranking.
+
+    Postings (term -> paper, term frequency) and document lengths live in their
+    own SQLite file next to the paper store, so the index survives restarts and
+    is updated incrementally as papers are added. A paper's title, authors and
+    summary are indexed as one document.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS docs (
+            paper_id TEXT PRIMARY KEY,
+            length   INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            term     TEXT NOT NULL,
+            paper_id TEXT NOT NULL,
+            tf       INTEGER NOT NULL,
+            PRIMARY KEY (term, paper_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_by_paper ON postings (paper_id);
+    """
+
+    def __init__(self, paper_dir: str, k1: float = 1.5, b: float = 0.75):
+        os.makedirs(paper_dir, exist_ok=True)
+        self.path = os.path.join(paper_dir, INDEX_DB_FILE)
+        self.k1 = k1
+        self.b = b
+        self._local = threading.local()
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _document(paper_info: dict) -> str:
+        return " ".join([
+            paper_info.get('title', ''),
+            " ".join(paper_info.get('authors', [])),
+            paper_info.get('summary', '')
+        ])
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def add_papers(self, papers_info: Dict[str, dict]) -> None:
+        """Index (or re-index) the given papers."""
+        conn = self._connect()
+        with conn:
+            for paper_id, paper_info in papers_info.items():
+                terms = Counter(tokenize(self._document(paper_info)))
+                conn.execute("DELETE FROM postings WHERE paper_id = ?", (paper_id,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO docs (paper_id, length) VALUES (?, ?)",
+                    (paper_id, sum(terms.values()))
+                )
+                conn.executemany(
+                    "INSERT INTO postings (term, paper_id, tf) VALUES (?, ?, ?)",
+                    [(term, paper_id, tf) for term, tf in terms.items()]
+                )
+
+    def search(self, query: str, k: int = 10) -> List[tuple]:
+        """Return up to k (paper_id, score) pairs, best match first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        conn = self._connect()
+        doc_count, total_length = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+        if doc_count == 0:
+            return []
+        avg_length = total_length / doc_count
+
+        scores: Dict[str, float] = {}
+        for term in terms:
+            rows = conn.execute(
+                """SELECT p.paper_id, p.tf, d.length FROM postings p
+                   JOIN docs d ON d.paper_id = p.paper_id WHERE p.term = ?""",
+                (term,)
+            ).fetchall()
+            if not rows:
+                continue
+            idf = math.log(1 + (doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+            for paper_id, tf, length in rows:
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[paper_id] = scores.get(paper_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def rebuild(self, store) -> int:
+        """Re-index every paper in a PaperStore and return the paper count."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM docs")
+        for topic in store.list_topics():
+            self.add_papers(store.get_topic_papers(topic) or {})
+        return len(self)
+
+
+if __name__ == "__main__":
+    # Rebuild the search index from the paper store:
+    #   uv run local_search.py [paper_dir]
+    paper_dir = sys.argv[1] if len(sys.argv) > 1 else os.getenv("PAPER_DIR", "papers")
+    store = open_paper_store(os.getenv("PAPER_STORE", "sqlite"), paper_dir)
+    count = BM25Index(paper_dir).rebuild(store)
+    print(f"Indexed {count} papers from {store.path}")
@@ -1,16 +1,31 @@
+from collections import deque
 from contextlib import AsyncExitStack
 from dotenv import load_dotenv
 # from anthropic import Anthropic
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from typing import List, TypedDict, Dict
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from typing import Deque, List, Optional, TypedDict, Dict
 import os
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI
 import json
 import asyncio
+import fnmatch
+import time
 import nest_asyncio
-
-nest_asyncio.apply()
+from tool_cache import ToolCallCache
+from chat_context import ContextBudget, content_text
+from blob_store import BlobStore
+from server_manifest import ServerManifest
+from server_pool import ServerPool, is_transport_error
+from tracing import SPAN_KIND_INTERNAL, Tracer
+
+# Only needed to call asyncio.run() where a loop is already running (notebooks);
+# elsewhere it breaks the anyio cancel scopes the streamable HTTP client relies on
+try:
+    asyncio.get_running_loop()
+    nest_asyncio.apply()
+except RuntimeError:
+    pass
 
 load_dotenv()
 
@@ -50,6 +65,29 @@ def convert_mcp_tool(mcp_tool: ToolDefinition) -> ToolDefinitionOpenAI:
         }
     }
 
+# Built-in tool for reading tool outputs that were spilled to the blob store
+READ_OUTPUT_TOOL: ToolDefinition = {
+    "name": "read_tool_output",
+    "description": (
+        "Read more of a large tool output that was truncated in the conversation. "
+        "Pass the handle from the truncation notice, and either an offset/length "
+        "to read a chunk or a search string to get the passages that mention it."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "handle": {"type": "string", "description": "Handle from the truncation notice"},
+            "offset": {"type": "integer", "description": "Character offset to start reading at", "default": 0},
+            "length": {"type": "integer", "description": "Number of characters to read", "default": 2000},
+            "search": {"type": "string", "description": "Text to look for instead of reading by offset"}
+        },
+        "required": ["handle"]
+    }
+}
+
+# Resources that change on every read; never cached, whatever a server's config says
+VOLATILE_RESOURCES = {"papers://metrics"}
+
 class MCP_ChatBot:
 
     def __init__(self):
@@ -58,7 +96,7 @@ class MCP_ChatBot:
         # self.sessions: List[ClientSession] = [] # new
         self.exit_stack = AsyncExitStack() # new
         
-        self.llm  = AzureOpenAI(
+        self.llm  = AsyncAzureOpenAI(
             api_key = os.getenv("DIAL_API_KEY"), 
             api_version = "2024-02-01",
             azure_endpoint = "https://ai-proxy.lab.epam.com"
@@ -70,59 +108,311 @@ class MCP_ChatBot:
         # self.tool_to_session: Dict[str, ClientSession] = {} # new
         self.available_prompts = []
         self.sessions = {}
+        self.openai_tools = [convert_mcp_tool(READ_OUTPUT_TOOL)]
+        # Server config, advertised capabilities and supervised session pool, by server name
+        self.server_configs: Dict[str, dict] = {}
+        self.server_capabilities: Dict[str, dict] = {}
+        self.server_pools: Dict[str, ServerPool] = {}
+        # Servers with a manifest entry are only spawned on first use of one of their tools
+        self.manifest = ServerManifest(os.getenv("MCP_MANIFEST", ".mcp_manifest.json"))
+        self.lazy_spawn = os.getenv("MCP_LAZY_SERVERS", "1") != "0"
+        self.spawn_locks: Dict[str, asyncio.Lock] = {}
+        self.background_tasks: set = set()
+        # Sessions are pinged and restarted with backoff when they die; idempotent
+        # tool calls that hit a dead session are retried once it is back
+        self.connect_timeout = float(os.getenv("MCP_CONNECT_TIMEOUT", "30"))
+        self.pool_size = int(os.getenv("MCP_POOL_SIZE", "1"))
+        self.ping_interval = float(os.getenv("MCP_PING_INTERVAL", "15"))
+        self.tool_retries = int(os.getenv("MCP_TOOL_RETRIES", "1"))
+        self.startup_times: Dict[str, float] = {}
+        # Tool, prompt and resource name -> server name, and a cap on concurrent tool calls per server
+        self.server_names: Dict[str, str] = {}
+        self.server_limits: Dict[str, asyncio.Semaphore] = {}
+        self.tool_concurrency = int(os.getenv("MCP_TOOL_CONCURRENCY", "4"))
+        # Time to first token and total time of the most recent LLM completions
+        self.llm_timings: Deque[Dict[str, float]] = deque(maxlen=1000)
+        # Ask for token usage in the final stream chunk (needs an API version that supports stream_options)
+        self.stream_usage = os.getenv("MCP_STREAM_USAGE", "0") == "1"
+        # Spans for every LLM request, tool call, resource read and prompt fetch (see /stats)
+        self.tracer = Tracer(
+            trace_file=os.getenv("MCP_TRACE_FILE"),
+            otlp_endpoint=os.getenv("MCP_OTLP_ENDPOINT")
+        )
+        # Results of idempotent tools and resource reads, dropped when a mutating tool
+        # runs against the same server
+        self.tool_cache = ToolCallCache(int(os.getenv("MCP_TOOL_CACHE_SIZE", "256")))
+        self.idempotent_tools: set = set()
+        # Older turns are compacted so each request stays under this many prompt tokens
+        self.context = ContextBudget(max_tokens=int(os.getenv("MCP_CONTEXT_TOKENS", "16000")))
+        self.context_compactions = 0
+        self.context_tokens_saved = 0
+        # Tool outputs longer than this are stored locally and replaced by a preview + handle
+        self.blobs = BlobStore(
+            os.getenv("MCP_BLOB_DIR", ".mcp_blobs"),
+            max_bytes=int(float(os.getenv("MCP_BLOB_MAX_MB", "256")) * 1024 * 1024),
+            max_age=float(os.getenv("MCP_BLOB_MAX_AGE", "86400"))
+        )
+        self.spill_chars = int(os.getenv("MCP_SPILL_CHARS", "8000"))
+        self.preview_chars = 1500
+
+    def spill(self, text: str) -> str:
+        """Replace an oversized tool output with a preview and a blob handle."""
+        if len(text) <= self.spill_chars:
+            return text
+        handle = self.blobs.put(text)
+        return (
+            f"{text[:self.preview_chars]}\n\n"
+            f"[Output truncated: showing {self.preview_chars} of {len(text)} characters. "
+            f"Call read_tool_output(handle='{handle}', offset={self.preview_chars}) to read on, "
+            f"or pass search='...' to find specific passages.]"
+        )
+
+    async def call_tool(self, tc: dict):
+        """Run one tool call from the LLM and return the content for its tool message.
+
+        Never raises: every tool call in an assistant message needs a reply, so
+        a failure is reported to the model as the tool's content instead.
+        """
+        name = tc["function"]["name"]
+        with self.tracer.span("tool.call", {
+            "mcp.tool": name,
+            "mcp.server": self.server_names.get(name),
+            "payload.request_bytes": len(tc["function"]["arguments"] or "")
+        }) as span:
+            try:
+                content = await self._call_tool(tc, span)
+            except Exception as e:
+                print(f"Tool call {name} failed: {e}")
+                span.error = str(e)
+                content = f"Tool {name} failed: {e}"
+            span.set("payload.response_bytes", len(content))
+            return content
+
+    async def _call_tool(self, tc: dict, span):
+        name = tc["function"]["name"]
+        arguments = tc["function"]["arguments"]
+        print(f" {name} : {arguments}")
+        if name == READ_OUTPUT_TOOL["name"]:
+            try:
+                return json.dumps(self.blobs.read(**json.loads(arguments or "{}")))
+            except (TypeError, ValueError) as e:
+                # Malformed JSON arguments or unexpected parameters from the model
+                span.error = str(e)
+                return f"Tool {name} failed: {e}"
+
+        # Get session (spawning a lazy server if needed) and call tool
+        session = await self.session_for(name)
+        if not session:
+            print(f"Tool {name} not found in available sessions.")
+            span.error = "not available"
+            return f"Tool {name} is not available."
 
-    async def process_query(self, query):
-        print(f"\nProcessing query: {query}")
-        messages = [{'role':'user', 'content':query}]
-        # process_query = True
-        while True:
-            # assistant_content = []
-            resp = self.llm.chat.completions.create(
+        server_name = self.server_names[name]
+        try:
+            args = json.loads(arguments or "{}")
+            cache_key = ToolCallCache.make_key(server_name, name, args)
+            if name in self.idempotent_tools:
+                cached = self.tool_cache.get(cache_key)
+                span.set("mcp.cached", cached is not None)
+                if cached is not None:
+                    print(f"Tool call result (cached): {name}")
+                    return cached
+
+            result = await self._call_with_retry(server_name, session, name, args)
+        except Exception as e:
+            print(f"Tool call {name} failed: {e}")
+            span.error = str(e)
+            return f"Tool {name} failed: {e}"
+        print(f"Tool call result: {result}")
+        span.set("mcp.is_error", bool(result.isError))
+        content = self.spill(content_text(result.content))
+
+        if name not in self.idempotent_tools:
+            # e.g. search_papers changes what extract_info and papers:// return
+            self.tool_cache.invalidate(server_name)
+        elif not result.isError:
+            self.tool_cache.put(server_name, cache_key, content)
+        return content
+
+    async def _call_with_retry(self, server_name: str, session: ClientSession, name: str, args: dict):
+        """Call a tool, retrying idempotent tools on a restarted session if this one died."""
+        attempts = 1 + (self.tool_retries if name in self.idempotent_tools else 0)
+        for attempt in range(attempts):
+            try:
+                async with self.server_limits[server_name]:
+                    return await session.call_tool(name, args)
+            except Exception as e:
+                # JSON-RPC error replies come from a healthy server; only a dropped transport
+                # warrants restarting the session
+                pool = self.server_pools.get(server_name)
+                if pool is None or not is_transport_error(e):
+                    raise
+                pool.mark_failed(session)
+                if attempt == attempts - 1:
+                    raise
+                print(f"Tool call {name} failed ({e!r}), retrying after reconnect...")
+                session = await pool.wait_ready(pool.connect_timeout)
+                if session is None:
+                    raise
+
+    async def complete(self, messages: list, on_text=None, record: Optional[dict] = None) -> dict:
+        """Stream one completion, printing text as it arrives.
+
+        Text deltas go to the `on_text` coroutine instead when one is given.
+        Tool-call deltas are assembled by index as they stream in. Returns the
+        assistant message as a dict ready to append to `messages`; timings and
+        token usage are added to `record["llm"]` when a record is passed.
+        """
+        with self.tracer.span("llm.request", {
+            "gen_ai.request.model": self.model_name,
+            "gen_ai.request.messages": len(messages),
+            "payload.request_bytes": sum(len(content_text(m.get("content"))) for m in messages)
+        }) as span:
+            started = time.perf_counter()
+            first_token = None
+            content_parts = []
+            tool_calls: Dict[int, dict] = {}
+            usage = None
+
+            options = {"stream_options": {"include_usage": True}} if self.stream_usage else {}
+            stream = await self.llm.chat.completions.create(
                 model = self.model_name,
                 tools = self.openai_tools,  # convert to OpenAI tool format
                 tool_choice = "auto",  # let the LLM decide which tool to use
                 messages = messages,
                 max_tokens = 2024,
-                temperature = 0.0
+                temperature = 0.0,
+                stream = True,
+                **options
             )
-            has_tool_use = False
-            msg = resp.choices[0].message
-            messages.append(msg)
-            # print(f"msg: {msg.model_dump_json(indent=2)}")
-
-            if not msg.tool_calls:
-                # If no tool calls, just print the response text
-                print(msg.content)
-                # process_query = False
-            else:
-                for tc in msg.tool_calls:
-                    has_tool_use = True
-                    print(f" {tc.function.name} : {tc.function.arguments}")
-                    # Get session and call tool
-                    # session = self.sessions[tc.function.name] # new
-                    session = self.sessions.get(tc.function.name)
-                    if not session:
-                        print(f"Tool {tc.function.name} not found in available sessions.")
-                        break
-
-                    result = await session.call_tool(tc.function.name, json.loads(tc.function.arguments))
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": result.content
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                # Azure sends a leading chunk with only content-filter results,
+                # and the usage chunk has no choices either
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if first_token is None and (delta.content or delta.tool_calls):
+                    first_token = time.perf_counter() - started
+                if delta.content:
+                    content_parts.append(delta.content)
+                    if on_text is not None:
+                        await on_text(delta.content)
+                    else:
+                        print(delta.content, end="", flush=True)
+                for tc_delta in delta.tool_calls or []:
+                    tc = tool_calls.setdefault(tc_delta.index, {
+                        "id": "", "type": "function", "function": {"name": "", "arguments": ""}
                     })
-                    print(f"Tool call result: {result}") 
-            if not has_tool_use:
-                break
+                    if tc_delta.id:
+                        tc["id"] = tc_delta.id
+                    if tc_delta.function and tc_delta.function.name:
+                        tc["function"]["name"] += tc_delta.function.name
+                    if tc_delta.function and tc_delta.function.arguments:
+                        tc["function"]["arguments"] += tc_delta.function.arguments
+            if content_parts and on_text is None:
+                print()
+
+            total = time.perf_counter() - started
+            self.llm_timings.append({"ttft": first_token if first_token is not None else total, "total": total})
+            print(f"[llm] first token {self.llm_timings[-1]['ttft']:.2f}s, complete {total:.2f}s")
+            span.set("gen_ai.response.time_to_first_token", self.llm_timings[-1]["ttft"])
+            span.set("gen_ai.usage.input_tokens", usage.prompt_tokens if usage else None)
+            span.set("gen_ai.usage.output_tokens", usage.completion_tokens if usage else None)
+            span.set("payload.response_bytes", sum(len(part) for part in content_parts))
+            span.set("gen_ai.response.tool_calls", len(tool_calls))
+            if record is not None:
+                record["llm"].append({
+                    **self.llm_timings[-1],
+                    "prompt_tokens": usage.prompt_tokens if usage else None,
+                    "completion_tokens": usage.completion_tokens if usage else None
+                })
+
+            msg = {"role": "assistant", "content": "".join(content_parts) or None}
+            if tool_calls:
+                msg["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+            return msg
+
+    async def _timed_call(self, tc: dict, record: dict) -> str:
+        started = time.perf_counter()
+        content = await self.call_tool(tc)
+        record["tool_calls"].append({
+            "name": tc["function"]["name"],
+            "arguments": tc["function"]["arguments"],
+            "seconds": time.perf_counter() - started,
+            "result_chars": len(content)
+        })
+        return content
+
+    async def process_query(self, query, messages: Optional[list] = None, on_text=None,
+                            record: Optional[dict] = None) -> str:
+        """Answer a query and return the final answer text.
+
+        The turn is appended to `messages`, so passing the same list again
+        continues a conversation; without one every query starts fresh. When
+        `record` is a dict, each completion is added to its "llm" list and each
+        tool call to its "tool_calls" list.
+        """
+        if record is not None:
+            record.setdefault("llm", [])
+            record.setdefault("tool_calls", [])
+        print(f"\nProcessing query: {query}")
+        if messages is None:
+            messages = []
+        messages.append({'role':'user', 'content':query})
+        try:
+            with self.tracer.span("query", {"payload.request_bytes": len(query)}, SPAN_KIND_INTERNAL):
+                # process_query = True
+                while True:
+                    has_tool_use = False
+                    fitted, saved = self.context.fit(messages)
+                    if saved:
+                        messages[:] = fitted
+                        self.context_compactions += 1
+                        self.context_tokens_saved += saved
+                        print(f"[context] compacted older turns, saved ~{saved} tokens")
+                    # Text is printed as it streams in
+                    msg = await self.complete(messages, on_text, record)
+                    messages.append(msg)
+
+                    if msg.get("tool_calls"):
+                        has_tool_use = True
+                        # Independent calls in one turn run concurrently (capped per server);
+                        # results go back in tool-call order
+                        results = await asyncio.gather(*[
+                            self.call_tool(tc) if record is None else self._timed_call(tc, record)
+                            for tc in msg["tool_calls"]
+                        ])
+                        for tc, content in zip(msg["tool_calls"], results):
+                            messages.append({
+                                "role": "tool",
+                                "tool_call_id": tc["id"],
+                                "content": content
+                            })
+                    if not has_tool_use:
+                        return msg.get("content") or ""
+        finally:
+            await self.tracer.flush()
+
+    def _resource_cacheable(self, server_name: Optional[str], resource_uri: str) -> bool:
+        """Whether a server opted this resource into the cache via its "idempotentResources" patterns."""
+        if server_name is None or resource_uri in VOLATILE_RESOURCES:
+            return False
+        patterns = self.server_configs.get(server_name, {}).get("idempotentResources", [])
+        return any(fnmatch.fnmatchcase(resource_uri, pattern) for pattern in patterns)
 
     async def get_resource(self, resource_uri):
-        session = self.sessions.get(resource_uri)
+        session = await self.session_for(resource_uri)
+
+        server_name = self.server_names.get(resource_uri)
 
         # Fallback for papers URIs - try any papers resource session
         if not session and resource_uri.startswith("papers://"):
-            for uri, sess in self.sessions.items():
+            for uri in list(self.server_names):
                 if uri.startswith("papers://"):
-                    session = sess
+                    session = await self.session_for(uri)
+                    server_name = self.server_names.get(uri)
                     break
         
         if not session:
@@ -130,7 +420,17 @@ class MCP_ChatBot:
             return None
         
         try:
-            result = await session.read_resource(uri = resource_uri)
+            with self.tracer.span("resource.read", {"mcp.server": server_name, "mcp.resource.uri": resource_uri}) as span:
+                cacheable = self._resource_cacheable(server_name, resource_uri)
+                cache_key = ToolCallCache.make_key(server_name, "read_resource", {"uri": resource_uri})
+                result = self.tool_cache.get(cache_key) if cacheable else None
+                span.set("mcp.cached", result is not None)
+                if result is None:
+                    result = await session.read_resource(uri = resource_uri)
+                    if cacheable:
+                        self.tool_cache.put(server_name, cache_key, result)
+                span.set("payload.response_bytes",
+                         sum(len(getattr(item, "text", "") or "") for item in result.contents or []))
             if result and result.contents:
                 print(f"\nResource: {resource_uri}")
                 print("Contents:")
@@ -139,6 +439,22 @@ class MCP_ChatBot:
                 print(f"No contents available")
         except Exception as e:
             print(f"Error reading resource {resource_uri}: {e}")
+        await self.tracer.flush()
+
+    def print_stats(self):
+        """Print the session's latency breakdown by span, plus cache and context stats."""
+        stats = self.tracer.stats()
+        if not stats:
+            print("No activity yet.")
+            return
+        print(f"\n{'span':<36}{'count':>7}{'total s':>9}{'mean ms':>9}{'p95 ms':>9}")
+        for key, values in stats.items():
+            print(f"{key:<36}{values['count']:>7}{values['total']:>9.2f}"
+                  f"{values['mean'] * 1000:>9.1f}{values['p95'] * 1000:>9.1f}")
+        cache = self.tool_cache.stats()
+        print(f"tool cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%})")
+        if self.context_compactions:
+            print(f"context: compacted {self.context_compactions} times, ~{self.context_tokens_saved} tokens saved")
 
     async def list_prompts(self):
         """List all available prompts."""
@@ -154,26 +470,37 @@ class MCP_ChatBot:
                     arg_name = arg.name if hasattr(arg, 'name') else arg.get("name", "")
                     print(f"     - {arg_name}")
 
-    async def execute_prompt(self, prompt_name, args):
-        """Execute a prompt with the given arguments."""
-        session = self.sessions.get(prompt_name)
+    async def render_prompt(self, prompt_name, args) -> Optional[str]:
+        """Fetch a prompt with the given arguments and return its text."""
+        session = await self.session_for(prompt_name)
         if not session:
             print(f"Prompt {prompt_name} not found in available sessions.")
-            return
-        
-        try:
+            return None
+
+        with self.tracer.span("prompt.get", {
+            "mcp.prompt": prompt_name,
+            "mcp.server": self.server_names.get(prompt_name),
+            "payload.request_bytes": len(json.dumps(args))
+        }) as span:
             result = await session.get_prompt(prompt_name, arguments=args)
-            if result and result.messages:
-                prompt_content = result.messages[0].content
-
-                # Extract text from content (handles different formats)
-                if isinstance(prompt_content, str):
-                    text = prompt_content
-                elif hasattr(prompt_content, 'text'):
-                    text = prompt_content.text
-                else:
-                    text = " ".join(item.text if hasattr(item, 'text') else str(item) 
-                                    for item in prompt_content)
+            span.set("payload.response_bytes", len(content_text(result.messages[0].content)) if result.messages else 0)
+        if not (result and result.messages):
+            return None
+        prompt_content = result.messages[0].content
+
+        # Extract text from content (handles different formats)
+        if isinstance(prompt_content, str):
+            return prompt_content
+        if hasattr(prompt_content, 'text'):
+            return prompt_content.text
+        return " ".join(item.text if hasattr(item, 'text') else str(item)
+                        for item in prompt_content)
+
+    async def execute_prompt(self, prompt_name, args):
+        """Execute a prompt with the given arguments."""
+        try:
+            text = await self.render_prompt(prompt_name, args)
+            if text:
                 print(f"\nExecution prompt '{prompt_name}' {text}...")
                 await self.process_query(text)
 
@@ -186,8 +513,10 @@ class MCP_ChatBot:
         print("Type your queies or 'quit' to exit.")        
         print("Use @folders to see available topics")
         print("Use @<topic> to ssearch papers in that topic")
+        print("Use @<topic>?page=<n> to see more papers in a large topic")
         print("Use /prompts to list available prompts")
         print("Use /prompt <name> <arg1=value1> to execute a prompt")
+        print("Use /stats to see where this session's time went")
 
         while True:
             try:
@@ -214,6 +543,8 @@ class MCP_ChatBot:
 
                     if command == "/prompts":
                         await self.list_prompts()
+                    elif command == "/stats":
+                        self.print_stats()
                     elif command == "/prompt":
                         if len(parts) < 2:
                             print("Usage: /prompt <name> [arg1=value1 ...]")
@@ -240,76 +571,212 @@ class MCP_ChatBot:
             except Exception as e:
                 print(f"\nError: {str(e)}")
     
-    async def connect_to_server(self, server_name: str, server_config: dict)-> None:
-        # Create server parameters for stdio connection
-        # server_params = StdioServerParameters(
-        #     command="uv",  # Executable
-        #     args=["run", "research_server.py"],  # Optional command line arguments
-        #     env=None,  # Optional environment variables
-        # )
+    async def _spawn_server(self, server_name: str) -> Optional[ClientSession]:
+        """Start a server's session pool and wait for the handshakes."""
+        server_config = self.server_configs[server_name]
+        pool = ServerPool(
+            server_name,
+            server_config,
+            size=int(server_config.get("poolSize", self.pool_size)),
+            connect_timeout=float(server_config.get("connectTimeout", self.connect_timeout)),
+            ping_interval=self.ping_interval,
+            on_change=self._on_pool_change
+        )
+        self.exit_stack.push_async_callback(pool.close)
+        if not await pool.start():
+            await pool.close()
+            return None
+        self.server_pools[server_name] = pool
+        return pool.primary
+
+    def _on_pool_change(self, server_name: str) -> None:
+        # A restarted server has lost whatever state the cached results reflected
+        self.tool_cache.invalidate(server_name)
+        self._rebuild_catalog()
+
+    @staticmethod
+    async def _list_optional(server_call):
+        """Await a prompts/resources listing; None if the server doesn't implement it."""
         try:
-            server_params = StdioServerParameters(**server_config)
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            ) # new
-            read, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read, write)
-            ) # new
-            await session.initialize()
-            # self.sessions.append(session)
-
-            # List available tools for this session
-            try:
-                response = await session.list_tools()
-                tools = response.tools
-                print(f"\nConnected to {server_name} with tools:", [t.name for t in tools])
-
-                # List available tools
-                for tool in tools: # new
-                    # self.tool_to_session[tool.name] = session
-                    self.sessions[tool.name] = session
-                    self.available_tools.append({
-                        "name": tool.name,
-                        "description": tool.description,
-                        "input_schema": tool.inputSchema
-                    })        
-                self.openai_tools = [convert_mcp_tool(tool) for tool in self.available_tools] 
-
-                # List available prompts
-                prompts_response = await session.list_prompts()
-                if prompts_response and prompts_response.prompts:
-                    for prompt in prompts_response.prompts:
-                        self.sessions[prompt.name] = session
-                        self.available_prompts.append({
-                            "name": prompt.name,
-                            "description": prompt.description,
-                            "arguments": prompt.arguments
-                        })
-                # List available resource
-                resources_response = await session.list_resources()
-                if resources_response and resources_response.resources:
-                    for resource in resources_response.resources:
-                        resource_uri = str(resource.uri)
-                        self.sessions[resource_uri] = session
-                
+            return await server_call
+        except McpError:
+            return None
 
-            except Exception as e:
-                print(f"Error: {e}")
+    @classmethod
+    async def _list_capabilities(cls, session: ClientSession) -> dict:
+        """Collect a server's tools, prompts and resources as plain, JSON-ready dicts.
+
+        Prompts and resources are optional: a server that answers "Method not
+        found" for either still registers its tools.
+        """
+        capabilities = {"tools": [], "prompts": [], "resources": []}
+
+        # List available tools
+        response = await session.list_tools()
+        for tool in response.tools:
+            annotations = tool.annotations
+            capabilities["tools"].append({
+                "name": tool.name,
+                "description": tool.description,
+                "input_schema": tool.inputSchema,
+                "read_only": bool(annotations and (annotations.readOnlyHint or annotations.idempotentHint))
+            })
+
+        # List available prompts
+        prompts_response = await cls._list_optional(session.list_prompts())
+        if prompts_response and prompts_response.prompts:
+            for prompt in prompts_response.prompts:
+                capabilities["prompts"].append({
+                    "name": prompt.name,
+                    "description": prompt.description,
+                    "arguments": [arg.model_dump() for arg in prompt.arguments or []]
+                })
+
+        # List available resources
+        resources_response = await cls._list_optional(session.list_resources())
+        if resources_response and resources_response.resources:
+            for resource in resources_response.resources:
+                capabilities["resources"].append(str(resource.uri))
+        return capabilities
+
+    def _rebuild_catalog(self) -> None:
+        """Rebuild tools, prompts and name -> session routing from every known server."""
+        self.available_tools = []
+        self.available_prompts = []
+        self.sessions = {}
+        self.server_names = {}
+        self.idempotent_tools = set()
+
+        for server_name, capabilities in self.server_capabilities.items():
+            server_config = self.server_configs[server_name]
+            pool = self.server_pools.get(server_name)
+            session = pool.primary if pool else None
+            names = [tool["name"] for tool in capabilities["tools"]]
+            names += [prompt["name"] for prompt in capabilities["prompts"]]
+            names += capabilities["resources"]
+            for name in names:
+                self.server_names[name] = server_name
+                if session is not None:
+                    self.sessions[name] = session
+
+            for tool in capabilities["tools"]:
+                if tool["read_only"] or tool["name"] in server_config.get("idempotentTools", []):
+                    self.idempotent_tools.add(tool["name"])
+                self.available_tools.append({
+                    "name": tool["name"],
+                    "description": tool["description"],
+                    "input_schema": tool["input_schema"]
+                })
+            self.available_prompts.extend(capabilities["prompts"])
+
+        self.openai_tools = [convert_mcp_tool(tool) for tool in self.available_tools + [READ_OUTPUT_TOOL]]
+
+    async def session_for(self, name: str) -> Optional[ClientSession]:
+        """Return a session serving a tool, prompt or resource, spawning its server on first use.
+
+        Calls are spread round-robin over a server's live sessions.
+        """
+        server_name = self.server_names.get(name)
+        if server_name is None:
+            return None
+        pool = self.server_pools.get(server_name)
+        if pool is None:
+            return await self._start_lazy_server(server_name)
+        return pool.session() or await pool.wait_ready(pool.connect_timeout)
+
+    async def _start_lazy_server(self, server_name: str) -> Optional[ClientSession]:
+        # Concurrent first uses share one spawn
+        async with self.spawn_locks.setdefault(server_name, asyncio.Lock()):
+            pool = self.server_pools.get(server_name)
+            session = pool.primary if pool else None
+            if pool is None:
+                print(f"\nStarting {server_name} on first use...")
+                session = await self._spawn_server(server_name)
+                if session is None:
+                    return None
+                self._rebuild_catalog()
+                # The manifest may be stale; refresh it without holding up this call
+                task = asyncio.create_task(self._refresh_capabilities(server_name, session))
+                self.background_tasks.add(task)
+                task.add_done_callback(self.background_tasks.discard)
+        return session
+
+    async def _refresh_capabilities(self, server_name: str, session: ClientSession) -> None:
+        try:
+            capabilities = await asyncio.wait_for(
+                self._list_capabilities(session), self.server_pools[server_name].connect_timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Error refreshing capabilities of {server_name}: no answer within the connect timeout")
+            return
+        except Exception as e:
+            print(f"Error refreshing capabilities of {server_name}: {e}")
+            return
+        self.manifest.put(server_name, self.server_configs[server_name], capabilities)
+        self.server_capabilities[server_name] = capabilities
+        self._rebuild_catalog()
+
+    async def connect_to_server(self, server_name: str, server_config: dict)-> None:
+        """Register a server from the manifest, or start it and register what it offers."""
+        started = time.perf_counter()
+        self.server_configs[server_name] = server_config
+        self.server_limits[server_name] = asyncio.Semaphore(
+            int(server_config.get("maxConcurrency", self.tool_concurrency))
+        )
+
+        capabilities = self.manifest.get(server_name, server_config)
+        if capabilities is not None and self.lazy_spawn and server_config.get("lazy", True):
+            self.server_capabilities[server_name] = capabilities
+            self._rebuild_catalog()
+            print(f"\nRegistered {server_name} from manifest with tools:",
+                  [tool["name"] for tool in capabilities["tools"]])
+            self.startup_times[server_name] = time.perf_counter() - started
+            return
+
+        session = await self._spawn_server(server_name)
+        if session is None:
+            return
 
+        # Listing counts against the same timeout as the handshake, so a server
+        # that hangs after initialize can't hold up the others either
+        pool = self.server_pools[server_name]
+        remaining = max(0.0, pool.connect_timeout - (time.perf_counter() - started))
+        try:
+            capabilities = await asyncio.wait_for(self._list_capabilities(session), remaining)
+            print(f"\nConnected to {server_name} with tools:", [tool["name"] for tool in capabilities["tools"]])
+            self.manifest.put(server_name, server_config, capabilities)
+            self.server_capabilities[server_name] = capabilities
+            self._rebuild_catalog()
+            self.startup_times[server_name] = time.perf_counter() - started
+
+        except asyncio.TimeoutError:
+            print(f"Failed to connect to {server_name}: capabilities not listed within {pool.connect_timeout:g}s")
+            del self.server_pools[server_name]
+            await pool.close()
         except Exception as e:
-            print(f"Failed to connect to {server_name}: {e}")
+            print(f"Error: {e}")
     
     async def connect_to_servers(self): # new
-        """Connect to all configured MCP servers."""
+        """Connect to all configured MCP servers concurrently."""
         try:
             with open("server_config.json", "r") as file:
                 data = json.load(file)
             
             servers = data.get("mcpServers", {})
-            
-            for server_name, server_config in servers.items():
-                await self.connect_to_server(server_name, server_config)
+
+            started = time.perf_counter()
+            await asyncio.gather(*[
+                self.connect_to_server(server_name, server_config)
+                for server_name, server_config in servers.items()
+            ])
+            total = time.perf_counter() - started
+
+            per_server = ", ".join(
+                f"{name} {self.startup_times[name]:.2f}s" + ("" if name in self.server_pools else " (lazy)")
+                if name in self.startup_times else f"{name} failed"
+                for name in servers
+            )
+            print(f"\nReady {len(self.startup_times)}/{len(servers)} servers in {total:.2f}s ({per_server})")
         except Exception as e:
             print(f"Error loading server configuration: {e}")
             raise
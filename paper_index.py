@@ -0,0 +1,131 @@
+import json
+import os
+import sys
+import threading
+from typing import Dict, Optional, Tuple
+
+
+INDEX_FILE = "paper_index.jsonl"
+PAPERS_FILE = "papers_info.json"
+# The log is rewritten once it holds this many lines per live entry
+COMPACT_RATIO = 2
+
+
+class PaperIndex:
+    """Persistent paper ID -> (topic, record) index over the papers directory.
+
+    The index is an append-only JSON-lines log stored next to the topic folders.
+    It is loaded into memory once, so each lookup is a dict probe, and each
+    `update` appends only the new records instead of rewriting the whole file.
+    Later lines override earlier ones, and a torn last line (e.g. after a crash)
+    is skipped on load. Once superseded lines make up most of the log it is
+    compacted to one line per paper.
+    """
+
+    def __init__(self, paper_dir: str):
+        self.paper_dir = paper_dir
+        self.path = os.path.join(paper_dir, INDEX_FILE)
+        self._entries: Optional[Dict[str, Tuple[str, dict]]] = None
+        self._lines = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Tuple[str, dict]]:
+        if self._entries is not None:
+            return self._entries
+
+        if not os.path.exists(self.path):
+            # First run against an existing papers/ tree
+            self._entries = self._scan()
+            self._write_all(self._entries)
+            return self._entries
+
+        entries = {}
+        lines = 0
+        with open(self.path, "r") as index_file:
+            for line in index_file:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    entries[entry["id"]] = (entry["topic"], entry["info"])
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+        self._entries = entries
+        self._lines = lines
+        self._compact_if_needed()
+        return entries
+
+    def _compact_if_needed(self) -> None:
+        if self._lines > COMPACT_RATIO * max(len(self._entries), 1):
+            self._write_all(self._entries)
+
+    def _scan(self) -> Dict[str, Tuple[str, dict]]:
+        """Read every topic's papers_info.json into a fresh mapping."""
+        entries = {}
+        if not os.path.isdir(self.paper_dir):
+            return entries
+
+        for topic in sorted(os.listdir(self.paper_dir)):
+            file_path = os.path.join(self.paper_dir, topic, PAPERS_FILE)
+            if not os.path.isfile(file_path):
+                continue
+            try:
+                with open(file_path, "r") as json_file:
+                    papers_info = json.load(json_file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error reading {file_path}: {str(e)}")
+                continue
+            for paper_id, paper_info in papers_info.items():
+                entries[paper_id] = (topic, paper_info)
+        return entries
+
+    def _write_all(self, entries: Dict[str, Tuple[str, dict]]) -> None:
+        os.makedirs(self.paper_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as index_file:
+            for paper_id, (topic, paper_info) in entries.items():
+                index_file.write(json.dumps({"id": paper_id, "topic": topic, "info": paper_info}) + "\n")
+        os.replace(tmp_path, self.path)
+        self._lines = len(entries)
+
+    def load(self) -> None:
+        """Load the index now; on first run this scans the existing topic folders.
+
+        Call it before writing a topic file so the scan doesn't pick up
+        records that `update` is about to append.
+        """
+        with self._lock:
+            self._load()
+
+    def get(self, paper_id: str) -> Optional[Tuple[str, dict]]:
+        """Return (topic, record) for a paper ID, or None if it isn't stored."""
+        with self._lock:
+            return self._load().get(paper_id)
+
+    def update(self, topic: str, papers_info: Dict[str, dict]) -> None:
+        """Record the given papers as stored under `topic`."""
+        if not papers_info:
+            return
+        with self._lock:
+            entries = self._load()
+            os.makedirs(self.paper_dir, exist_ok=True)
+            with open(self.path, "a") as index_file:
+                for paper_id, paper_info in papers_info.items():
+                    index_file.write(json.dumps({"id": paper_id, "topic": topic, "info": paper_info}) + "\n")
+                    entries[paper_id] = (topic, paper_info)
+            self._lines += len(papers_info)
+            self._compact_if_needed()
+
+    def rebuild(self) -> int:
+        """Rebuild the index from the topic folders and return the paper count."""
+        with self._lock:
+            self._entries = self._scan()
+            self._write_all(self._entries)
+            return len(self._entries)
+
+
+if __name__ == "__main__":
+    # Rebuild the index for an existing papers/ tree:
+    #   uv run paper_index.py [paper_dir]
+    paper_dir = sys.argv[1] if len(sys.argv) > 1 else "papers"
+    count = PaperIndex(paper_dir).rebuild()
+    print(f"Indexed {count} papers from {paper_dir}")
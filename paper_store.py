@@ -0,0 +1,354 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from paper_index import PAPERS_FILE, PaperIndex
+
+
+DB_FILE = "papers.db"
+
+# Fields of a stored paper record
+PAPER_FIELDS = ('title', 'authors', 'summary', 'pdf_url', 'published')
+
+
+def normalize_topic(topic: str) -> str:
+    """Map a free-form topic to its storage key (and folder name)."""
+    return topic.lower().replace(" ", "_")
+
+
+class PaperStore(ABC):
+    """Storage backend for paper records grouped by topic.
+
+    A record is the dict built by search_papers: title, authors, summary,
+    pdf_url and published. Topics are always passed in normalized form.
+    """
+
+    path: str
+
+    @abstractmethod
+    def upsert_papers(self, topic: str, papers_info: Dict[str, dict]) -> None:
+        """Insert or update records and attach them to `topic`."""
+
+    def upsert_many(self, topics: Dict[str, Dict[str, dict]]) -> None:
+        """Upsert the papers of several topics (topic -> paper ID -> record) in one pass."""
+        for topic, papers_info in topics.items():
+            self.upsert_papers(topic, papers_info)
+
+    @abstractmethod
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        """Return the stored record for a paper ID, or None."""
+
+    def get_papers(self, paper_ids: List[str]) -> Dict[str, dict]:
+        """Return paper ID -> record for the IDs that are stored; missing IDs are left out."""
+        found = {}
+        for paper_id in paper_ids:
+            paper_info = self.get_paper(paper_id)
+            if paper_info is not None:
+                found[paper_id] = paper_info
+        return found
+
+    @abstractmethod
+    def list_topics(self) -> List[str]:
+        """Return every topic with at least one stored paper."""
+
+    @abstractmethod
+    def get_topic_papers(self, topic: str, offset: int = 0, limit: Optional[int] = None) -> Optional[Dict[str, dict]]:
+        """Return paper ID -> record for a topic, or None if the topic is unknown.
+
+        `offset` and `limit` select a slice of the topic in insertion order.
+        """
+
+    @abstractmethod
+    def count_topic_papers(self, topic: str) -> int:
+        """Return how many papers are stored under a topic."""
+
+    def topic_has_papers(self, topic: str, paper_ids: List[str]) -> bool:
+        """Return whether every given paper ID is attached to `topic`."""
+        papers_info = self.get_topic_papers(topic) or {}
+        return all(paper_id in papers_info for paper_id in paper_ids)
+
+    @abstractmethod
+    def topic_version(self, topic: str) -> Optional[str]:
+        """Return a token that changes whenever a topic's papers change, or None if unknown."""
+
+    def close(self) -> None:
+        pass
+
+
+class JsonPaperStore(PaperStore):
+    """Compatibility backend: one papers/<topic>/papers_info.json per topic.
+
+    Writes go to a temporary file that is atomically renamed over the old one,
+    so a crash mid-write never leaves a truncated papers_info.json behind.
+    Paper ID lookups go through the PaperIndex.
+    """
+
+    def __init__(self, paper_dir: str):
+        self.path = paper_dir
+        self.index = PaperIndex(paper_dir)
+        self._lock = threading.Lock()
+
+    def _topic_file(self, topic: str) -> str:
+        return os.path.join(self.path, topic, PAPERS_FILE)
+
+    def _read_topic(self, topic: str) -> Dict[str, dict]:
+        with open(self._topic_file(topic), "r") as json_file:
+            return json.load(json_file)
+
+    def upsert_papers(self, topic: str, papers_info: Dict[str, dict]) -> None:
+        with self._lock:
+            self.index.load()
+            os.makedirs(os.path.join(self.path, topic), exist_ok=True)
+            try:
+                existing = self._read_topic(topic)
+            except (FileNotFoundError, json.JSONDecodeError):
+                existing = {}
+            existing.update(papers_info)
+
+            file_path = self._topic_file(topic)
+            tmp_path = file_path + ".tmp"
+            with open(tmp_path, "w") as json_file:
+                json.dump(existing, json_file, indent=2)
+                json_file.flush()
+                os.fsync(json_file.fileno())
+            os.replace(tmp_path, file_path)
+            self.index.update(topic, papers_info)
+
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        entry = self.index.get(paper_id)
+        return entry[1] if entry is not None else None
+
+    def list_topics(self) -> List[str]:
+        if not os.path.exists(self.path):
+            return []
+        return [
+            topic for topic in os.listdir(self.path)
+            if os.path.isfile(self._topic_file(topic))
+        ]
+
+    def get_topic_papers(self, topic: str, offset: int = 0, limit: Optional[int] = None) -> Optional[Dict[str, dict]]:
+        # json.JSONDecodeError is left to the caller to report
+        try:
+            papers_info = self._read_topic(topic)
+        except FileNotFoundError:
+            return None
+        if offset or limit is not None:
+            paper_ids = list(papers_info)[offset:None if limit is None else offset + limit]
+            papers_info = {paper_id: papers_info[paper_id] for paper_id in paper_ids}
+        return papers_info
+
+    def count_topic_papers(self, topic: str) -> int:
+        try:
+            return len(self._read_topic(topic))
+        except FileNotFoundError:
+            return 0
+
+    def topic_version(self, topic: str) -> Optional[str]:
+        try:
+            stat = os.stat(self._topic_file(topic))
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class SqlitePaperStore(PaperStore):
+    """SQLite backend (WAL mode) stored at papers/papers.db.
+
+    Papers are keyed by ID, so lookups are index probes, and search results
+    are upserted row by row inside a single transaction instead of rewriting
+    a whole topic file. Each thread gets its own connection.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS papers (
+            paper_id  TEXT PRIMARY KEY,
+            title     TEXT NOT NULL,
+            authors   TEXT NOT NULL,
+            summary   TEXT NOT NULL,
+            pdf_url   TEXT,
+            published TEXT
+        );
+        CREATE TABLE IF NOT EXISTS topic_papers (
+            topic    TEXT NOT NULL,
+            paper_id TEXT NOT NULL REFERENCES papers(paper_id),
+            PRIMARY KEY (topic, paper_id)
+        );
+        CREATE TABLE IF NOT EXISTS topics (
+            topic   TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, paper_dir: str):
+        os.makedirs(paper_dir, exist_ok=True)
+        self.paper_dir = paper_dir
+        self.path = os.path.join(paper_dir, DB_FILE)
+        self._local = threading.local()
+        is_new = not os.path.exists(self.path)
+        self._connect().executescript(self.SCHEMA)
+        if is_new:
+            # Carry over a papers/ tree written by the JSON layout
+            self.import_json_tree()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_info(row) -> dict:
+        return {
+            'title': row[0],
+            'authors': json.loads(row[1]),
+            'summary': row[2],
+            'pdf_url': row[3],
+            'published': row[4]
+        }
+
+    def upsert_papers(self, topic: str, papers_info: Dict[str, dict]) -> None:
+        self.upsert_many({topic: papers_info})
+
+    def upsert_many(self, topics: Dict[str, Dict[str, dict]]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                """INSERT INTO papers (paper_id, title, authors, summary, pdf_url, published)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(paper_id) DO UPDATE SET
+                       title = excluded.title,
+                       authors = excluded.authors,
+                       summary = excluded.summary,
+                       pdf_url = excluded.pdf_url,
+                       published = excluded.published""",
+                [
+                    (paper_id, info['title'], json.dumps(info['authors']), info['summary'],
+                     info.get('pdf_url'), info.get('published'))
+                    for papers_info in topics.values()
+                    for paper_id, info in papers_info.items()
+                ]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO topic_papers (topic, paper_id) VALUES (?, ?)",
+                [(topic, paper_id) for topic, papers_info in topics.items() for paper_id in papers_info]
+            )
+            conn.executemany(
+                """INSERT INTO topics (topic, version) VALUES (?, 1)
+                   ON CONFLICT(topic) DO UPDATE SET version = version + 1""",
+                [(topic,) for topic in topics]
+            )
+
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT title, authors, summary, pdf_url, published FROM papers WHERE paper_id = ?",
+            (paper_id,)
+        ).fetchone()
+        return self._row_to_info(row) if row is not None else None
+
+    def get_papers(self, paper_ids: List[str]) -> Dict[str, dict]:
+        conn = self._connect()
+        found = {}
+        unique_ids = list(dict.fromkeys(paper_ids))
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(unique_ids), 500):
+            chunk = unique_ids[start:start + 500]
+            rows = conn.execute(
+                f"""SELECT paper_id, title, authors, summary, pdf_url, published FROM papers
+                    WHERE paper_id IN ({', '.join('?' * len(chunk))})""",
+                chunk
+            ).fetchall()
+            for row in rows:
+                found[row[0]] = self._row_to_info(row[1:])
+        return found
+
+    def list_topics(self) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT DISTINCT topic FROM topic_papers ORDER BY topic"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_topic_papers(self, topic: str, offset: int = 0, limit: Optional[int] = None) -> Optional[Dict[str, dict]]:
+        if self.topic_version(topic) is None:
+            return None
+        rows = self._connect().execute(
+            """SELECT p.paper_id, p.title, p.authors, p.summary, p.pdf_url, p.published
+               FROM topic_papers t JOIN papers p ON p.paper_id = t.paper_id
+               WHERE t.topic = ? ORDER BY t.rowid LIMIT ? OFFSET ?""",
+            (topic, -1 if limit is None else limit, offset)
+        ).fetchall()
+        return {row[0]: self._row_to_info(row[1:]) for row in rows}
+
+    def count_topic_papers(self, topic: str) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM topic_papers WHERE topic = ?", (topic,)
+        ).fetchone()[0]
+
+    def topic_has_papers(self, topic: str, paper_ids: List[str]) -> bool:
+        conn = self._connect()
+        unique_ids = list(dict.fromkeys(paper_ids))
+        for start in range(0, len(unique_ids), 500):
+            chunk = unique_ids[start:start + 500]
+            attached = conn.execute(
+                f"""SELECT COUNT(*) FROM topic_papers
+                    WHERE topic = ? AND paper_id IN ({', '.join('?' * len(chunk))})""",
+                [topic, *chunk]
+            ).fetchone()[0]
+            if attached < len(chunk):
+                return False
+        return True
+
+    def topic_version(self, topic: str) -> Optional[str]:
+        row = self._connect().execute(
+            """SELECT COALESCE((SELECT version FROM topics WHERE topic = ?), 0),
+                      EXISTS(SELECT 1 FROM topic_papers WHERE topic = ?)""",
+            (topic, topic)
+        ).fetchone()
+        return str(row[0]) if row[1] else None
+
+    def import_json_tree(self) -> int:
+        """Import every papers/<topic>/papers_info.json and return the paper count."""
+        json_store = JsonPaperStore(self.paper_dir)
+        count = 0
+        for topic in json_store.list_topics():
+            try:
+                papers_info = json_store.get_topic_papers(topic) or {}
+            except json.JSONDecodeError as e:
+                print(f"Error reading {json_store._topic_file(topic)}: {str(e)}")
+                continue
+            self.upsert_papers(topic, papers_info)
+            count += len(papers_info)
+        return count
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+STORES = {
+    "sqlite": SqlitePaperStore,
+    "json": JsonPaperStore,
+}
+
+
+def open_paper_store(kind: str, paper_dir: str) -> PaperStore:
+    """Create the storage backend named by `kind` ("sqlite" or "json")."""
+    if kind not in STORES:
+        raise ValueError(f"Unknown paper store: {kind} (expected one of {', '.join(STORES)})")
+    return STORES[kind](paper_dir)
+
+
+if __name__ == "__main__":
+    # Import an existing JSON papers/ tree into the SQLite store:
+    #   uv run paper_store.py [paper_dir]
+    paper_dir = sys.argv[1] if len(sys.argv) > 1 else "papers"
+    count = SqlitePaperStore(paper_dir).import_json_tree()
+    print(f"Imported {count} papers from {paper_dir} into {os.path.join(paper_dir, DB_FILE)}")
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class QueryCache:
+    """TTL + LRU cache for arXiv query results.
+
+    Entries expire `ttl` seconds after they were stored, and once more than
+    `max_entries` are held the least recently used one is evicted. If
+    `persist_path` is given, the cache is loaded from and saved to that JSON
+    file so results survive a server restart. A `ttl` of 0 disables caching.
+    """
+
+    def __init__(self, ttl: float = 900, max_entries: int = 256, persist_path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if persist_path:
+            self._load()
+
+    @staticmethod
+    def make_key(topic: str, max_results: int, sort_by: str) -> str:
+        """Build a cache key from the normalized query parameters."""
+        return f"{sort_by}|{max_results}|{' '.join(topic.lower().split())}"
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.persist_path:
+                self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self.persist_path:
+                self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl
+            }
+
+    def _load(self) -> None:
+        try:
+            with open(self.persist_path, "r") as cache_file:
+                data = json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        # Stored oldest first, so insertion order is the LRU order
+        for key, (stored_at, value) in data.items():
+            if now - stored_at < self.ttl:
+                self._entries[key] = (stored_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(self._entries, cache_file)
+        os.replace(tmp_path, self.persist_path)
@@ -1,12 +1,74 @@
 
 import arxiv
+import asyncio
 import json
 import os
-from typing import List
+from typing import List, Optional, Tuple, Union
+from urllib.parse import parse_qs
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from local_search import BM25Index
+from arxiv_fetch import PRIORITY_BATCH, PRIORITY_INTERACTIVE, ArxivScheduler
+from paper_store import PAPER_FIELDS, normalize_topic, open_paper_store
+from query_cache import QueryCache
+from server_metrics import Metrics, directory_size
+from tool_executor import SingleFlight, ToolExecutor
 
 
-PAPER_DIR = "papers"
+PAPER_DIR = os.getenv("PAPER_DIR", "papers")
+
+# Call counts and latencies per tool/resource, arXiv latency and store traffic,
+# served as papers://metrics and in Prometheus format at METRICS_PATH ("" to disable)
+metrics = Metrics()
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+
+# Storage backend shared by all tools and resources: "sqlite" (default) or "json"
+store = metrics.meter(
+    open_paper_store(os.getenv("PAPER_STORE", "sqlite"), PAPER_DIR),
+    reads=("get_paper", "get_papers", "get_topic_papers", "list_topics"),
+    writes=("upsert_papers", "upsert_many")
+)
+
+# BM25 index over stored papers for search_local, kept next to the store
+search_index = BM25Index(PAPER_DIR)
+if len(search_index) == 0 and store.list_topics():
+    search_index.rebuild(store)
+
+# Recent arXiv results, keyed by normalized topic, max_results and sort criterion.
+# Set ARXIV_CACHE_FILE to keep the cache across restarts.
+query_cache = QueryCache(
+    ttl=float(os.getenv("ARXIV_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("ARXIV_CACHE_SIZE", "256")),
+    persist_path=os.getenv("ARXIV_CACHE_FILE")
+)
+
+# papers://{topic} is served in pages; rendered pages are cached per topic version
+TOPIC_PAGE_SIZE = int(os.getenv("TOPIC_PAGE_SIZE", "20"))
+TOPIC_MAX_PAGE_SIZE = 200
+render_cache = QueryCache(ttl=float("inf"), max_entries=int(os.getenv("RENDER_CACHE_SIZE", "128")))
+
+# Blocking tool work (arXiv HTTP, disk I/O) runs here instead of on the event loop
+executor = ToolExecutor(
+    max_workers=int(os.getenv("RESEARCH_MAX_WORKERS", "8")),
+    timeout=float(os.getenv("RESEARCH_TOOL_TIMEOUT", "60"))
+)
+
+# Identical concurrent search_papers calls share one fetch and one write
+search_flight = SingleFlight()
+
+# One arXiv client for the whole process, paced to ARXIV_MIN_INTERVAL seconds per request.
+# ARXIV_API_URL points it at another Atom endpoint (e.g. benchmarks/fake_arxiv.py).
+scheduler = ArxivScheduler(
+    executor,
+    min_interval=float(os.getenv("ARXIV_MIN_INTERVAL", "3")),
+    page_size=int(os.getenv("ARXIV_PAGE_SIZE", "100")),
+    num_retries=int(os.getenv("ARXIV_NUM_RETRIES", "3")),
+    api_url=os.getenv("ARXIV_API_URL"),
+    on_fetch=metrics.observe_arxiv
+)
 
 # Initialize FastMCP server
 # mcp = FastMCP("research")
@@ -14,46 +76,35 @@ PAPER_DIR = "papers"
 mcp = FastMCP("research", port=8001)
 
 
-@mcp.tool()
-def search_papers(topic: str, max_results: int = 5) -> dict:
-    """Search for papers on arXiv based on a topic and store their information.
-
-    Args:
-        topic: The topic to search for
-        max_results: Maximum number of results to retrieve (default: 5)
+async def fetch_papers(
+    topic: str,
+    max_results: int,
+    sort_by: arxiv.SortCriterion = arxiv.SortCriterion.Relevance,
+    priority: int = PRIORITY_INTERACTIVE
+) -> Tuple[dict, bool]:
+    """Query arXiv for a topic, serving repeated queries from the query cache.
 
     Returns:
-        A dictionary containing a list of paper IDs that were found.
+        A dictionary mapping paper IDs to their information, in result order,
+        and whether it came from the query cache.
     """
-    # Use arxiv to find the papers
-    client = arxiv.Client()
+    cache_key = QueryCache.make_key(topic, max_results, sort_by.name)
+    papers_info = query_cache.get(cache_key)
+    if papers_info is not None:
+        return papers_info, True
 
     # Search for the most relevant articles matching the queried topic
     search = arxiv.Search(
         query = topic,
         max_results = max_results,
-        sort_by = arxiv.SortCriterion.Relevance
+        sort_by = sort_by
     )
 
-    papers = client.results(search)
-
-    # Create directory for this topic
-    path = os.path.join(PAPER_DIR, topic.lower().replace(" ", "_"))
-    os.makedirs(path, exist_ok=True)
-
-    file_path = os.path.join(path, "papers_info.json")
-
-    # Try to load existing papers info
-    try:
-        with open(file_path, "r") as json_file:
-            papers_info = json.load(json_file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        papers_info = {}
+    papers = await scheduler.fetch(search, priority)
 
     # Process each paper and add to papers_info  
-    paper_ids = []
+    papers_info = {}
     for paper in papers:
-        paper_ids.append(paper.get_short_id())
         paper_info = {
             'title': paper.title,
             'authors': [author.name for author in paper.authors],
@@ -63,61 +114,215 @@ def search_papers(topic: str, max_results: int = 5) -> dict:
         }
         papers_info[paper.get_short_id()] = paper_info
 
-    # Save updated papers_info to json file
-    with open(file_path, "w") as json_file:
-        json.dump(papers_info, json_file, indent=2)
-    print(f"Results are saved in: {file_path}")
+    query_cache.put(cache_key, papers_info)
+    return papers_info, False
+
+
+def _persist(topics: dict) -> None:
+    """Upsert topic -> papers into the store and the local search index."""
+    store.upsert_many(topics)
+    search_index.add_papers({
+        paper_id: paper_info
+        for papers_info in topics.values()
+        for paper_id, paper_info in papers_info.items()
+    })
+    print(f"Results are saved in: {store.path}")
+
+
+def _is_stored(topic_key: str, papers_info: dict) -> bool:
+    """Whether every record is already stored unchanged and attached to the topic.
+
+    Used for query-cache hits, whose results were persisted when first fetched:
+    upserting them again would only bump the topic version (dropping its
+    rendered pages) and, with the JSON store, rewrite the topic file. The query
+    cache key collapses whitespace and the topic key doesn't, so a hit can
+    still belong to a topic it was never saved under.
+    """
+    return (store.get_papers(list(papers_info)) == papers_info
+            and store.topic_has_papers(topic_key, list(papers_info)))
+
+
+async def _search_papers(topic: str, max_results: int) -> dict:
+    """Fetch a topic from arXiv and upsert the results into the store."""
+    papers_info, cached = await fetch_papers(topic, max_results)
+    paper_ids = list(papers_info)
+
+    # Upsert the new papers under this topic
+    topic_key = normalize_topic(topic)
+    if not (cached and await executor.run(_is_stored, topic_key, papers_info)):
+        await executor.run(_persist, {topic_key: papers_info})
     return {"papers_id_list": paper_ids}
-    
 
-    
 
 @mcp.tool()
-def extract_info(paper_id: str) -> dict:
-    """Search for information about a specific paper across all topic directories.
+@metrics.instrument("tool")
+async def search_papers(topic: str, max_results: int = 5) -> dict:
+    """Search for papers on arXiv based on a topic and store their information.
 
     Args:
-        paper_id: The ID of the paper to look for
+        topic: The topic to search for
+        max_results: Maximum number of results to retrieve (default: 5)
 
     Returns:
-        A dictionary containing the paper's information if found, or an error message.
+        A dictionary containing a list of paper IDs that were found.
     """
-    for item in os.listdir(PAPER_DIR):
-        item_path = os.path.join(PAPER_DIR, item)
-        if os.path.isdir(item_path):
-            file_path = os.path.join(item_path, "papers_info.json")
-            if os.path.isfile(file_path):
-                try:
-                    with open(file_path, "r") as json_file:
-                        papers_info = json.load(json_file)
-                        if isinstance(paper_id, str) and paper_id in papers_info:
-                            # return json.dumps(papers_info[paper_id], indent=2)
-                            return papers_info[paper_id]
-                        elif isinstance(paper_id, list):
-                            return {pid: papers_info[pid] for pid in paper_id if pid in papers_info}
-                except (FileNotFoundError, json.JSONDecodeError) as e:
-                    print(f"Error reading {file_path}: {str(e)}")
-                    continue
+    flight_key = QueryCache.make_key(topic, max_results, arxiv.SortCriterion.Relevance.name)
+    try:
+        return await asyncio.wait_for(
+            search_flight.do(flight_key, lambda: _search_papers(topic, max_results)),
+            executor.timeout
+        )
+    except asyncio.TimeoutError:
+        return {"tool_error": f"Searching arXiv for '{topic}' timed out after {executor.timeout:g}s."}
+
+
+@mcp.tool()
+@metrics.instrument("tool")
+async def search_papers_batch(topics: List[str], max_results: int = 5) -> dict:
+    """Search for papers on arXiv for several topics at once and store their information.
+
+    Use this instead of calling search_papers repeatedly when sweeping many subtopics.
+
+    Args:
+        topics: The topics to search for
+        max_results: Maximum number of results to retrieve per topic (default: 5)
+
+    Returns:
+        A dictionary mapping each topic to the list of paper IDs that were found.
+    """
+    # One fetch per distinct topic; topics that normalize to the same folder share it
+    unique_topics = {}
+    for topic in topics:
+        unique_topics.setdefault(normalize_topic(topic), topic)
+
+    results = await asyncio.gather(
+        *[
+            asyncio.wait_for(fetch_papers(topic, max_results, priority=PRIORITY_BATCH), executor.timeout)
+            for topic in unique_topics.values()
+        ],
+        return_exceptions=True
+    )
+
+    fetched = {}
+    cached_topics = []
+    errors = {}
+    for (topic_key, topic), result in zip(unique_topics.items(), results):
+        if isinstance(result, asyncio.TimeoutError):
+            errors[topic] = f"Searching arXiv timed out after {executor.timeout:g}s."
+        elif isinstance(result, Exception):
+            errors[topic] = str(result)
+        else:
+            fetched[topic_key], cached = result
+            if cached:
+                cached_topics.append(topic_key)
+
+    # Persist every topic in a single pass, leaving out cache hits that are already stored
+    unstored = dict(fetched)
+    for topic_key in cached_topics:
+        if await executor.run(_is_stored, topic_key, fetched[topic_key]):
+            del unstored[topic_key]
+    if unstored:
+        await executor.run(_persist, unstored)
+
+    response = {
+        "papers_id_lists": {
+            topic: list(fetched[normalize_topic(topic)])
+            for topic in topics if normalize_topic(topic) in fetched
+        }
+    }
+    if errors:
+        response["tool_error"] = errors
+    return response
+
+
+def _extract_info(paper_id: Union[str, List[str]], fields: Optional[List[str]] = None) -> dict:
+    """Blocking body of extract_info."""
+    if fields:
+        unknown = [field for field in fields if field not in PAPER_FIELDS]
+        if unknown:
+            return {"tool_error": f"Unknown fields {unknown}; choose from {list(PAPER_FIELDS)}."}
+
+    def select(paper_info: dict) -> dict:
+        if not fields:
+            return paper_info
+        return {field: paper_info.get(field) for field in fields}
+
+    if isinstance(paper_id, list):
+        found = store.get_papers(paper_id)
+        return {
+            "found": {pid: select(info) for pid, info in found.items()},
+            "missing": [pid for pid in dict.fromkeys(paper_id) if pid not in found]
+        }
+
+    paper_info = store.get_paper(paper_id)
+    if paper_info is not None:
+        return select(paper_info)
 
     return {"tool_error" : f"There's no saved information related to paper {paper_id}."}
 
-@mcp.resource("papers://folders")
-def get_available_folders() -> str:
+
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+@metrics.instrument("tool")
+async def extract_info(paper_id: Union[str, List[str]], fields: Optional[List[str]] = None) -> dict:
+    """Search for information about one or more papers across all topic directories.
+
+    Pass a list of IDs to look them all up in a single call.
+
+    Args:
+        paper_id: The ID of the paper to look for, or a list of IDs
+        fields: Optional subset of fields to return (title, authors, summary, pdf_url, published)
+
+    Returns:
+        For a single ID, the paper's information if found, or an error message.
+        For a list of IDs, a dictionary with "found" (ID -> information) and "missing" (IDs not stored).
     """
-    List all available topic folders in the papers directory.
-    
-    This resource provides a simple list of all available topic folders.
+    try:
+        return await executor.run(_extract_info, paper_id, fields)
+    except asyncio.TimeoutError:
+        return {"tool_error": f"Looking up paper {paper_id} timed out after {executor.timeout:g}s."}
+
+
+def _search_local(query: str, k: int) -> dict:
+    """Blocking body of search_local."""
+    hits = search_index.search(query, k)
+    papers = store.get_papers([paper_id for paper_id, _ in hits])
+    return {
+        "results": [
+            {
+                "paper_id": paper_id,
+                "score": round(score, 4),
+                "title": papers[paper_id]['title'],
+                "authors": papers[paper_id]['authors'],
+                "published": papers[paper_id]['published']
+            }
+            for paper_id, score in hits if paper_id in papers
+        ]
+    }
+
+
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+@metrics.instrument("tool")
+async def search_local(query: str, k: int = 10) -> dict:
+    """Full-text search over papers that have already been stored, without contacting arXiv.
+
+    Prefer this over search_papers when the question may be answered by papers found earlier.
+
+    Args:
+        query: Words to match against paper titles, authors and summaries
+        k: Maximum number of results to return (default: 10)
+
+    Returns:
+        A dictionary with a "results" list of matching papers, best match first.
     """
-    folders = []
-    
-    # Get all topic directories
-    if os.path.exists(PAPER_DIR):
-        for topic_dir in os.listdir(PAPER_DIR):
-            topic_path = os.path.join(PAPER_DIR, topic_dir)
-            if os.path.isdir(topic_path):
-                papers_file = os.path.join(topic_path, "papers_info.json")
-                if os.path.exists(papers_file):
-                    folders.append(topic_dir)
+    try:
+        return await executor.run(_search_local, query, k)
+    except asyncio.TimeoutError:
+        return {"tool_error": f"Searching stored papers for '{query}' timed out after {executor.timeout:g}s."}
+
+
+def _render_folders() -> str:
+    """Blocking body of get_available_folders."""
+    folders = store.list_topics()
     
     # Create a simple markdown list
     content = "# Available Topics\n\n"
@@ -130,42 +335,127 @@ def get_available_folders() -> str:
     
     return content
 
-@mcp.resource("papers://{topic}")
-def get_topic_papers(topic: str) -> str:
+
+@mcp.resource("papers://folders")
+@metrics.instrument("resource", "papers://folders")
+async def get_available_folders() -> str:
     """
-    Get detailed information about papers on a specific topic.
+    List all available topic folders in the papers directory.
     
-    Args:
-        topic: The research topic to retrieve papers for
+    This resource provides a simple list of all available topic folders.
     """
-    topic_dir = topic.lower().replace(" ", "_")
-    papers_file = os.path.join(PAPER_DIR, topic_dir, "papers_info.json")
-    
-    if not os.path.exists(papers_file):
-        return f"# No papers found for topic: {topic}\n\nTry searching for papers on this topic first."
-    
+    return await executor.run(_render_folders)
+
+
+def _parse_topic_uri(topic: str) -> tuple:
+    """Split "topic?page=2&page_size=20" into (topic, page, page_size)."""
+    topic, _, query = topic.partition("?")
+    params = parse_qs(query)
     try:
-        with open(papers_file, 'r') as f:
-            papers_data = json.load(f)
-        
+        page = max(1, int(params.get("page", ["1"])[0]))
+        page_size = max(1, min(TOPIC_MAX_PAGE_SIZE, int(params.get("page_size", [str(TOPIC_PAGE_SIZE)])[0])))
+    except ValueError:
+        page, page_size = 1, TOPIC_PAGE_SIZE
+    return topic, page, page_size
+
+
+def _render_topic_papers(topic: str, page: int, page_size: int) -> str:
+    """Blocking body of get_topic_papers; renders one page of a topic."""
+    topic_key = normalize_topic(topic)
+    try:
+        version = store.topic_version(topic_key)
+        if version is None:
+            return f"# No papers found for topic: {topic}\n\nTry searching for papers on this topic first."
+
+        cache_key = f"{topic_key}|{version}|{page}|{page_size}"
+        content = render_cache.get(cache_key)
+        if content is not None:
+            return content
+
+        total = store.count_topic_papers(topic_key)
+        pages = max(1, -(-total // page_size))
+        # Past the end: show the last page rather than an empty one
+        page = min(page, pages)
+        papers_data = store.get_topic_papers(topic_key, offset=(page - 1) * page_size, limit=page_size) or {}
+
         # Create markdown content with paper details
-        content = f"# Papers on {topic.replace('_', ' ').title()}\n\n"
-        content += f"Total papers: {len(papers_data)}\n\n"
-        
+        parts = [
+            f"# Papers on {topic.replace('_', ' ').title()}\n\n",
+            f"Total papers: {total} (page {page} of {pages})\n\n"
+        ]
         for paper_id, paper_info in papers_data.items():
-            content += f"## {paper_info['title']}\n"
-            content += f"- **Paper ID**: {paper_id}\n"
-            content += f"- **Authors**: {', '.join(paper_info['authors'])}\n"
-            content += f"- **Published**: {paper_info['published']}\n"
-            content += f"- **PDF URL**: [{paper_info['pdf_url']}]({paper_info['pdf_url']})\n\n"
-            content += f"### Summary\n{paper_info['summary'][:500]}...\n\n"
-            content += "---\n\n"
-        
+            parts.append(
+                f"## {paper_info['title']}\n"
+                f"- **Paper ID**: {paper_id}\n"
+                f"- **Authors**: {', '.join(paper_info['authors'])}\n"
+                f"- **Published**: {paper_info['published']}\n"
+                f"- **PDF URL**: [{paper_info['pdf_url']}]({paper_info['pdf_url']})\n\n"
+                f"### Summary\n{paper_info['summary'][:500]}...\n\n"
+                "---\n\n"
+            )
+        if page < pages:
+            parts.append(f"More papers: use @{topic_key}?page={page + 1}&page_size={page_size}\n")
+
+        content = "".join(parts)
+        render_cache.put(cache_key, content)
         return content
     except json.JSONDecodeError:
         return f"# Error reading papers data for {topic}\n\nThe papers data file is corrupted."
 
 
+@mcp.resource("papers://{topic}")
+@metrics.instrument("resource", "papers://{topic}")
+async def get_topic_papers(topic: str) -> str:
+    """
+    Get detailed information about papers on a specific topic, one page at a time.
+    
+    Args:
+        topic: The research topic to retrieve papers for, optionally followed by
+            "?page=N&page_size=M" (e.g. papers://machine_learning?page=2)
+    """
+    topic, page, page_size = _parse_topic_uri(topic)
+    return await executor.run(_render_topic_papers, topic, page, page_size)
+
+
+def _collect_gauges() -> dict:
+    """Cache, scheduler and disk statistics, read when metrics are served."""
+    return {
+        "caches": {"arxiv_query": query_cache.stats(), "topic_render": render_cache.stats()},
+        "search_flight": {"coalesced": search_flight.coalesced},
+        "arxiv_scheduler": scheduler.stats(),
+        "papers_dir_bytes": directory_size(PAPER_DIR)
+    }
+
+
+# Concrete resources are matched before templates, so this is never read as a topic
+@mcp.resource("papers://metrics", mime_type="application/json")
+async def get_metrics() -> str:
+    """
+    Server metrics: call counts, errors and latency histograms per tool and resource,
+    arXiv upstream latency, cache hit rates and bytes read from and written to the paper store.
+    """
+    gauges = await executor.run(_collect_gauges)
+    return json.dumps(metrics.snapshot(gauges), indent=2)
+
+
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    gauges = await executor.run(_collect_gauges)
+    flat = {"research_papers_dir_bytes": gauges["papers_dir_bytes"]}
+    for cache, stats in gauges["caches"].items():
+        for key in ("hits", "misses", "hit_rate", "entries"):
+            flat[f'research_cache_{key}{{cache="{cache}"}}'] = stats[key]
+    flat["research_single_flight_coalesced"] = gauges["search_flight"]["coalesced"]
+    scheduler_stats = gauges["arxiv_scheduler"]
+    flat["research_arxiv_queue_depth"] = scheduler_stats["queue_depth"]
+    flat["research_arxiv_wait_seconds_avg"] = scheduler_stats["avg_wait"]
+    flat["research_arxiv_wait_seconds_max"] = scheduler_stats["max_wait"]
+    return PlainTextResponse(metrics.prometheus(flat), media_type="text/plain; version=0.0.4")
+
+
+if METRICS_PATH:
+    mcp.custom_route(METRICS_PATH, methods=["GET"])(prometheus_metrics)
+
+
 @mcp.prompt()
 def generate_search_prompt(topic: str, num_papers: int = 5) -> str:
     """Generate a prompt for Claude to find and discuss academic papers on a specific topic."""
@@ -191,7 +481,27 @@ def generate_search_prompt(topic: str, num_papers: int = 5) -> str:
     Please present both detailed information about each paper and a high-level synthesis of the research landscape in {topic}."""
 
 
+def http_app() -> Starlette:
+    """One app serving both HTTP transports: SSE at /sse (+ /messages/) and streamable HTTP at /mcp."""
+    streamable = mcp.streamable_http_app()
+    routes = list(streamable.routes)
+    paths = {route.path for route in routes}
+    routes += [route for route in mcp.sse_app().routes if route.path not in paths]
+    # The streamable HTTP session manager has to run for the app's lifetime
+    return Starlette(routes=routes, lifespan=lambda app: mcp.session_manager.run())
+
+
+def serve(transport: str = "sse") -> None:
+    """Run the server over "sse", "streamable-http", "both" (one port) or "stdio"."""
+    if transport == "both":
+        import uvicorn
+        uvicorn.run(http_app(), host=mcp.settings.host, port=mcp.settings.port,
+                    log_level=mcp.settings.log_level.lower())
+    else:
+        mcp.run(transport=transport)
+
+
 if __name__ == "__main__":
     # Initialize and run the server
     # mcp.run(transport='stdio')
-    mcp.run(transport="sse")
+    serve(os.getenv("MCP_TRANSPORT", "sse"))
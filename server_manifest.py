@@ -0,0 +1,42 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+
+class ServerManifest:
+    """On-disk cache of the tools, prompts and resources each MCP server advertises.
+
+    Entries are keyed by server name and a hash of the server's config, so
+    editing a server's command or arguments invalidates its entry. With a
+    manifest entry the chatbot can hand the tool schemas to the LLM without
+    starting the server.
+    """
+
+    def __init__(self, path: str = ".mcp_manifest.json"):
+        self.path = path
+        try:
+            with open(path, "r") as manifest_file:
+                self._entries = json.load(manifest_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    @staticmethod
+    def config_hash(server_config: dict) -> str:
+        return hashlib.sha256(json.dumps(server_config, sort_keys=True).encode()).hexdigest()
+
+    def get(self, server_name: str, server_config: dict) -> Optional[dict]:
+        entry = self._entries.get(server_name)
+        if entry is None or entry.get("config_hash") != self.config_hash(server_config):
+            return None
+        return entry["capabilities"]
+
+    def put(self, server_name: str, server_config: dict, capabilities: dict) -> None:
+        self._entries[server_name] = {
+            "config_hash": self.config_hash(server_config),
+            "capabilities": capabilities
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(self._entries, manifest_file, indent=2)
+        os.replace(tmp_path, self.path)
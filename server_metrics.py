@@ -0,0 +1,231 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, Prometheus style."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self) -> Iterable[Tuple[float, int]]:
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (inf if past the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {str(bound): total for bound, total in self.cumulative()}
+        }
+
+
+class _MeteredProxy:
+    """Forwards to `target`, counting the JSON size of what read methods return
+    and of what write methods are given."""
+
+    def __init__(self, target, metrics: "Metrics", reads: Tuple[str, ...], writes: Tuple[str, ...]):
+        self._target = target
+        self._metrics = metrics
+        self._reads = reads
+        self._writes = writes
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if name in self._reads:
+            @functools.wraps(attribute)
+            def read(*args, **kwargs):
+                result = attribute(*args, **kwargs)
+                self._metrics.add_bytes(read=_json_size(result))
+                return result
+            return read
+        if name in self._writes:
+            @functools.wraps(attribute)
+            def write(*args, **kwargs):
+                self._metrics.add_bytes(written=_json_size([args, kwargs]))
+                return attribute(*args, **kwargs)
+            return write
+        return attribute
+
+
+def _json_size(value) -> int:
+    if value is None:
+        return 0
+    return len(json.dumps(value, default=str))
+
+
+def _finite(value):
+    """Replace inf/nan (e.g. an unbounded cache TTL) with None so the result is strict JSON."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    return value
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class Metrics:
+    """In-process metrics for the research server.
+
+    Tracks call counts, errors and latency histograms per tool and resource
+    (via the `instrument` decorator), arXiv upstream request latency, and
+    bytes moved through the paper store (via `meter`). `snapshot` returns
+    them as a dict for the papers://metrics resource and `prometheus`
+    renders them in the Prometheus text format; both take extra gauges, such
+    as cache statistics, collected at render time.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self.calls: Dict[Tuple[str, str], Histogram] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.arxiv = Histogram(buckets)
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            key = (kind, name)
+            self.calls.setdefault(key, Histogram(self.buckets)).observe(seconds)
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def observe_arxiv(self, seconds: float) -> None:
+        with self._lock:
+            self.arxiv.observe(seconds)
+
+    def add_bytes(self, read: int = 0, written: int = 0) -> None:
+        with self._lock:
+            self.bytes_read += read
+            self.bytes_written += written
+
+    def instrument(self, kind: str, name: Optional[str] = None):
+        """Decorate an async tool or resource function to record its calls.
+
+        A raised exception or a dict result carrying "tool_error" counts as an error.
+        """
+        def decorator(fn):
+            label = name or fn.__name__
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                error = True
+                try:
+                    result = await fn(*args, **kwargs)
+                    error = isinstance(result, dict) and "tool_error" in result
+                    return result
+                finally:
+                    self.observe(kind, label, time.perf_counter() - started, error)
+            return wrapper
+        return decorator
+
+    def meter(self, target, reads: Tuple[str, ...] = (), writes: Tuple[str, ...] = ()):
+        """Wrap an object so the named read/write methods count bytes (JSON-encoded size)."""
+        return _MeteredProxy(target, self, reads, writes)
+
+    def snapshot(self, gauges: Optional[dict] = None) -> dict:
+        with self._lock:
+            calls = {
+                f"{kind}:{name}": {"errors": self.errors.get((kind, name), 0), **histogram.summary()}
+                for (kind, name), histogram in sorted(self.calls.items())
+            }
+            return _finite({
+                "uptime": time.time() - self.started,
+                "calls": calls,
+                "arxiv_upstream": self.arxiv.summary(),
+                "store_bytes": {"read": self.bytes_read, "written": self.bytes_written},
+                **(gauges or {})
+            })
+
+    def prometheus(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """Render metrics in the Prometheus text exposition format.
+
+        `gauges` maps metric names (optionally with a {label="..."} suffix) to values.
+        """
+        lines = []
+
+        def histogram(metric: str, labels: str, hist: Histogram) -> None:
+            for bound, total in hist.cumulative():
+                lines.append(f'{metric}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {total}')
+            lines.append(f'{metric}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {hist.count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{metric}_sum{suffix} {hist.sum}")
+            lines.append(f"{metric}_count{suffix} {hist.count}")
+
+        with self._lock:
+            lines.append("# HELP research_calls_total Tool and resource calls.")
+            lines.append("# TYPE research_calls_total counter")
+            for (kind, name), hist in sorted(self.calls.items()):
+                lines.append(f'research_calls_total{{kind="{kind}",name="{name}"}} {hist.count}')
+            lines.append("# HELP research_call_errors_total Tool and resource calls that failed.")
+            lines.append("# TYPE research_call_errors_total counter")
+            for (kind, name) in sorted(self.calls):
+                lines.append(f'research_call_errors_total{{kind="{kind}",name="{name}"}} '
+                             f'{self.errors.get((kind, name), 0)}')
+            lines.append("# HELP research_call_duration_seconds Tool and resource call latency.")
+            lines.append("# TYPE research_call_duration_seconds histogram")
+            for (kind, name), hist in sorted(self.calls.items()):
+                histogram("research_call_duration_seconds", f'kind="{kind}",name="{name}"', hist)
+            lines.append("# HELP research_arxiv_request_duration_seconds arXiv API request latency.")
+            lines.append("# TYPE research_arxiv_request_duration_seconds histogram")
+            histogram("research_arxiv_request_duration_seconds", "", self.arxiv)
+            lines.append("# HELP research_store_bytes_total Bytes read from and written to the paper store.")
+            lines.append("# TYPE research_store_bytes_total counter")
+            lines.append(f'research_store_bytes_total{{direction="read"}} {self.bytes_read}')
+            lines.append(f'research_store_bytes_total{{direction="written"}} {self.bytes_written}')
+
+        typed = set()
+        for metric, value in (gauges or {}).items():
+            base = metric.split("{", 1)[0]
+            if base not in typed:
+                typed.add(base)
+                lines.append(f"# TYPE {base} gauge")
+            lines.append(f"{metric} {float(value)}")
+        return "\n".join(lines) + "\n"
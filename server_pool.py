@@ -0,0 +1,257 @@
+import asyncio
+import itertools
+import os
+import time
+from contextlib import AsyncExitStack
+from typing import Callable, List, Optional
+
+import anyio
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+# Idle HTTP connections to remote servers are kept open this long between calls
+HTTP_KEEPALIVE = float(os.getenv("MCP_HTTP_KEEPALIVE", "120"))
+
+
+def http_client_factory(headers: Optional[dict] = None, timeout: Optional[httpx.Timeout] = None,
+                        auth: Optional[httpx.Auth] = None) -> httpx.AsyncClient:
+    """httpx client for the SSE and streamable HTTP transports.
+
+    Each session reuses its client's connection pool for every request, and
+    idle connections stay alive for HTTP_KEEPALIVE seconds (httpx defaults to
+    5), so calls a few seconds apart don't pay for a new TCP/TLS handshake.
+    """
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=timeout or httpx.Timeout(30.0),
+        auth=auth,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=HTTP_KEEPALIVE)
+    )
+
+
+def is_transport_error(error: BaseException) -> bool:
+    """Whether a failed request means the session itself is gone.
+
+    An McpError is an ordinary JSON-RPC error reply from a live server, except
+    the "Connection closed" error the session gives pending requests when its
+    transport drops.
+    """
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream,
+                              OSError, httpx.TransportError))
+
+
+def transport_of(config: dict) -> str:
+    """"stdio" for command entries; for url entries the "transport" key, else guessed from the URL."""
+    if "url" not in config:
+        return "stdio"
+    return config.get("transport") or ("sse" if config["url"].rstrip("/").endswith("/sse") else "streamable-http")
+
+
+class _Slot:
+    """One warm session of a pool and the task that owns its transport."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.task: Optional[asyncio.Task] = None
+        self.stop: Optional[asyncio.Event] = None
+        self.session: Optional[ClientSession] = None
+        self.failures = 0
+        self.next_attempt = 0.0
+
+
+class ServerPool:
+    """Supervised pool of `size` sessions to one MCP server.
+
+    `config` is a stdio entry (command, args, env) or a remote entry with a
+    `url`, an optional `transport` ("sse" or "streamable-http") and optional
+    `headers`. Each session's transport lives in a task of its own (anyio contexts
+    must be exited by the task that entered them), so a single session can be
+    torn down and restarted without touching the others. A supervisor task
+    pings every session each `ping_interval` seconds and restarts dead ones,
+    backing off exponentially up to `max_backoff` seconds between failed
+    attempts. `on_change(name)` is called whenever the set of live sessions
+    changes so callers can rebuild their routing. Calls are spread over the
+    live sessions round-robin.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: dict,
+        size: int = 1,
+        connect_timeout: float = 30,
+        ping_interval: float = 15,
+        ping_timeout: float = 5,
+        max_backoff: float = 60,
+        on_change: Optional[Callable[[str], None]] = None
+    ):
+        self.name = name
+        self.config = config
+        self.connect_timeout = connect_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.max_backoff = max_backoff
+        self.on_change = on_change
+        self.restarts = 0
+        self.slots = [_Slot(index) for index in range(max(1, size))]
+        self._round_robin = itertools.count()
+        self._wake = asyncio.Event()
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def _run_slot(self, slot: _Slot, ready: asyncio.Future, stop: asyncio.Event) -> None:
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await self._open_transport(stack)
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                ready.set_result(session)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"Server {self.name} session {slot.index} stopped: {e}")
+                slot.session = None
+                self._wake.set()
+
+    async def _open_transport(self, stack: AsyncExitStack):
+        transport = transport_of(self.config)
+        if transport == "stdio":
+            return await stack.enter_async_context(stdio_client(StdioServerParameters(**self.config)))
+        url = self.config["url"]
+        headers = self.config.get("headers")
+        if transport == "sse":
+            return await stack.enter_async_context(
+                sse_client(url, headers=headers, httpx_client_factory=http_client_factory)
+            )
+        if transport == "streamable-http":
+            read, write, _ = await stack.enter_async_context(
+                streamablehttp_client(url, headers=headers, httpx_client_factory=http_client_factory)
+            )
+            return read, write
+        raise ValueError(f"Unknown transport {transport!r} for {self.name}")
+
+    def _backoff(self, slot: _Slot) -> float:
+        return min(self.max_backoff, 2 ** (slot.failures - 1))
+
+    async def _start_slot(self, slot: _Slot) -> bool:
+        ready = asyncio.get_running_loop().create_future()
+        slot.stop = asyncio.Event()
+        slot.task = asyncio.create_task(self._run_slot(slot, ready, slot.stop))
+        try:
+            slot.session = await asyncio.wait_for(asyncio.shield(ready), self.connect_timeout)
+            slot.failures = 0
+            return True
+        except asyncio.TimeoutError:
+            print(f"Failed to connect to {self.name}: no handshake within {self.connect_timeout:g}s")
+            slot.task.cancel()
+        except Exception as e:
+            print(f"Failed to connect to {self.name}: {e}")
+        slot.session = None
+        slot.failures += 1
+        slot.next_attempt = time.monotonic() + self._backoff(slot)
+        return False
+
+    async def _stop_slot(self, slot: _Slot) -> None:
+        slot.session = None
+        if slot.task is None:
+            return
+        slot.stop.set()
+        try:
+            await asyncio.wait_for(slot.task, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print(f"Error stopping {self.name}: {e}")
+        slot.task = None
+
+    async def start(self) -> bool:
+        """Start every session; succeed if at least one completed its handshake."""
+        started = await asyncio.gather(*[self._start_slot(slot) for slot in self.slots])
+        self._supervisor = asyncio.create_task(self._supervise())
+        return any(started)
+
+    def live_sessions(self) -> List[ClientSession]:
+        return [slot.session for slot in self.slots if slot.session is not None]
+
+    @property
+    def primary(self) -> Optional[ClientSession]:
+        sessions = self.live_sessions()
+        return sessions[0] if sessions else None
+
+    def session(self) -> Optional[ClientSession]:
+        """Return the next live session, round-robin."""
+        sessions = self.live_sessions()
+        if not sessions:
+            return None
+        return sessions[next(self._round_robin) % len(sessions)]
+
+    def mark_failed(self, session: ClientSession) -> None:
+        """Report a session whose call failed so the supervisor checks it now."""
+        for slot in self.slots:
+            if slot.session is session:
+                slot.session = None
+        self._wake.set()
+        if self.on_change:
+            self.on_change(self.name)
+
+    async def wait_ready(self, timeout: float) -> Optional[ClientSession]:
+        """Wait up to `timeout` seconds for a live session."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            session = self.session()
+            if session is not None:
+                return session
+            await asyncio.sleep(0.1)
+        return self.session()
+
+    async def _supervise(self) -> None:
+        while True:
+            pending = [slot.next_attempt for slot in self.slots if slot.session is None]
+            wait = self.ping_interval
+            if pending:
+                wait = max(0.0, min(wait, min(pending) - time.monotonic()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            changed = False
+            for slot in self.slots:
+                if slot.session is not None:
+                    try:
+                        await asyncio.wait_for(slot.session.send_ping(), self.ping_timeout)
+                        continue
+                    except Exception as e:
+                        print(f"Server {self.name} session {slot.index} failed health check: {e!r}")
+                        changed = True
+                if time.monotonic() < slot.next_attempt:
+                    continue
+                await self._stop_slot(slot)
+                print(f"Restarting {self.name} session {slot.index}...")
+                self.restarts += 1
+                if await self._start_slot(slot):
+                    changed = True
+                else:
+                    print(f"Retrying {self.name} in {self._backoff(slot):g}s")
+
+            if changed and self.on_change:
+                self.on_change(self.name)
+
+    async def close(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+        await asyncio.gather(*[self._stop_slot(slot) for slot in self.slots])
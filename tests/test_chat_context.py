@@ -0,0 +1,65 @@
+from chat_context import ContextBudget, estimate_tokens
+
+
+def tool_pair(call_id: str, result_chars: int) -> list:
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "extract_info", "arguments": "{}"}}
+        ]},
+        {"role": "tool", "tool_call_id": call_id, "content": "x" * result_chars}
+    ]
+
+
+def test_fit_keeps_current_question_of_continued_conversation():
+    current = {"role": "user", "content": "u2 " + "q" * 2000}
+    messages = [
+        {"role": "user", "content": "u1"},
+        {"role": "assistant", "content": "a1 " + "a" * 4000},
+        current,
+        *tool_pair("call_1", 4000),
+        *tool_pair("call_2", 4000)
+    ]
+
+    fitted, saved = ContextBudget(max_tokens=2100).fit(messages)
+
+    assert saved > 0
+    assert current in fitted
+    assert fitted.index(current) < fitted.index(messages[3])
+    assert fitted[-4:] == messages[-4:]
+
+
+def test_fit_compacts_tool_results_of_a_single_question():
+    question = {"role": "user", "content": "Find papers on graph neural networks"}
+    messages = [question]
+    for call in range(10):
+        messages.extend(tool_pair(f"call_{call}", 20000))
+
+    budget = ContextBudget(max_tokens=16000)
+    fitted, saved = budget.fit(messages)
+
+    assert saved > 0
+    assert sum(estimate_tokens(message) for message in fitted) <= 16000
+    assert fitted[0] == question
+    assert fitted[-4:] == messages[-4:]
+    # Every remaining tool result still answers a call that is kept
+    call_ids = {tc["id"] for message in fitted for tc in message.get("tool_calls") or []}
+    assert all(message["tool_call_id"] in call_ids for message in fitted if message["role"] == "tool")
+
+
+def test_fit_leaves_messages_under_budget_alone():
+    messages = [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}]
+
+    assert ContextBudget(max_tokens=100).fit(messages) == (messages, 0)
+
+
+def test_fit_drops_oldest_turns_but_not_first_request():
+    messages = [{"role": "user", "content": "first"}]
+    for turn in range(5):
+        messages.append({"role": "assistant", "content": "a" * 2000})
+        messages.append({"role": "user", "content": f"question {turn}"})
+
+    fitted, _ = ContextBudget(max_tokens=600, keep_recent=2).fit(messages)
+
+    assert fitted[0] == messages[0]
+    assert fitted[-2:] == messages[-2:]
+    assert len(fitted) < len(messages)
@@ -0,0 +1,57 @@
+import json
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class ToolCallCache:
+    """Session-scoped LRU cache for idempotent tool calls and resource reads.
+
+    Entries are keyed by server, tool (or resource) name and the canonical
+    JSON form of the arguments, so {"a": 1, "b": 2} and {"b": 2, "a": 1} hit the
+    same entry. Each entry remembers its server, so everything cached for a
+    server can be dropped when a mutating tool runs against it.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(server_name: str, name: str, arguments: Optional[dict]) -> str:
+        canonical = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{server_name}\x1f{name}\x1f{canonical}"
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, server_name: str, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (server_name, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, server_name: str) -> int:
+        """Drop every entry cached for a server and return how many were dropped."""
+        stale = [key for key, (server, _) in self._entries.items() if server == server_name]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries)
+        }
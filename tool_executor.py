@@ -0,0 +1,58 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class ToolExecutor:
+    """Runs blocking tool bodies on a bounded thread pool, off the event loop.
+
+    At most `max_workers` calls run at once; further calls wait in the pool's
+    queue. Each call is bounded by `timeout` seconds. A timed-out call raises
+    asyncio.TimeoutError to the awaiting tool, while the worker thread is left
+    to finish in the background (Python threads cannot be interrupted).
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: float = 60):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="research-tool")
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout if timeout is not None else self.timeout)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts `fn`; callers arriving while it is still
+    running await the same result (or exception) instead of starting their own.
+    The shared task is shielded, so one caller being cancelled does not cancel
+    it for the others.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _forget(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception retrieved even if every caller was cancelled
+            future.exception()
@@ -0,0 +1,151 @@
+import contextvars
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+
+import httpx
+
+# OTLP span kinds: work inside the chatbot, and calls out to the LLM or an MCP server
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation with attributes, OTLP-style IDs and a parent."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: dict, kind: int):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Collects spans for LLM requests, tool calls, resource reads and prompt fetches.
+
+    Spans nest through a context variable, so spans opened while another is
+    active (including in tasks started by asyncio.gather) become its children;
+    a span with no parent starts a new trace. Durations are aggregated per
+    span name and tool for `stats()`: count and total over the tracer's life,
+    p95 over the last `window` spans of each kind. When `trace_file` or `otlp_endpoint` is
+    set, `flush()` exports finished spans as OTLP/JSON: one
+    ExportTraceServiceRequest per line of the file, or POSTed to the endpoint
+    (e.g. http://localhost:4318/v1/traces).
+    """
+
+    def __init__(self, service_name: str = "mcp-chatbot", trace_file: Optional[str] = None,
+                 otlp_endpoint: Optional[str] = None, window: int = 1000):
+        self.service_name = service_name
+        self.trace_file = trace_file
+        self.otlp_endpoint = otlp_endpoint
+        self.window = window
+        self.durations: Dict[str, Deque[float]] = {}
+        self.counts: Dict[str, int] = {}
+        self.totals: Dict[str, float] = {}
+        self._pending: List[Span] = []
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[dict] = None, kind: int = SPAN_KIND_CLIENT):
+        parent = _current_span.get()
+        span = Span(name, parent.trace_id if parent else os.urandom(16).hex(),
+                    parent.span_id if parent else None, attributes or {}, kind)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            key = name
+            for detail in ("mcp.tool", "mcp.prompt"):
+                if detail in span.attributes:
+                    key = f"{name} {span.attributes[detail]}"
+            self.durations.setdefault(key, deque(maxlen=self.window)).append(span.duration)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.totals[key] = self.totals.get(key, 0.0) + span.duration
+            if self.trace_file or self.otlp_endpoint:
+                self._pending.append(span)
+
+    def stats(self) -> Dict[str, dict]:
+        stats = {}
+        for key, values in sorted(self.durations.items()):
+            ordered = sorted(values)
+            stats[key] = {
+                "count": self.counts[key],
+                "total": self.totals[key],
+                "mean": self.totals[key] / self.counts[key],
+                "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+            }
+        return stats
+
+    def to_otlp(self, spans: List[Span]) -> dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}}
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "mcp_chatbot"},
+                    "spans": [{
+                        "traceId": span.trace_id,
+                        "spanId": span.span_id,
+                        **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                        "name": span.name,
+                        "kind": span.kind,
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns),
+                        "attributes": [
+                            {"key": key, "value": _otlp_value(value)}
+                            for key, value in span.attributes.items() if value is not None
+                        ],
+                        "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                    } for span in spans]
+                }]
+            }]
+        }
+
+    async def flush(self) -> None:
+        """Export finished spans to the trace file and/or OTLP endpoint."""
+        if not self._pending:
+            return
+        spans, self._pending = self._pending, []
+        payload = self.to_otlp(spans)
+        if self.trace_file:
+            with open(self.trace_file, "a", encoding="utf-8") as trace_file:
+                trace_file.write(json.dumps(payload) + "\n")
+        if self.otlp_endpoint:
+            try:
+                async with httpx.AsyncClient(timeout=5) as client:
+                    response = await client.post(self.otlp_endpoint, json=payload)
+                    response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"Error exporting traces to {self.otlp_endpoint}: {e}")